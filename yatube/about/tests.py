@@ -1,8 +1,10 @@
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 
 class StaticURLTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_about_author(self):
@@ -1,9 +1,16 @@
 from django.views.generic.base import TemplateView
 
+from core.page_cache import PageCachePolicy
+from core.query_budget import QueryBudget
+
 
 class AboutAuthorView(TemplateView):
     template_name = 'about/author.html'
+    query_budget = QueryBudget(2, None)
+    page_cache = PageCachePolicy(None, shared=True)
 
 
 class AboutTechView(TemplateView):
     template_name = 'about/tech.html'
+    query_budget = QueryBudget(2, None)
+    page_cache = PageCachePolicy(None, shared=True)
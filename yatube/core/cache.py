@@ -0,0 +1,224 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+STAMP_KEY = 'tiered:stamp:{}'
+MISSING = object()
+
+
+def get_namespace(key):
+    """Пространство ключа — часть до первого двоеточия: feed, card, page.
+
+    Ключи без двоеточия (например, sorl-thumbnail) делят общее пустое.
+    """
+    return key.split(':', 1)[0] if ':' in key else ''
+
+
+class NearCache:
+    """Ограниченный LRU в памяти процесса, общий для всех его потоков."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Пространство -> (штамп, время проверки по monotonic).
+        self.stamps = {}
+
+    def get(self, key, stamp):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires, entry_stamp = entry
+            if entry_stamp != stamp or expires <= time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value, ttl, stamp, max_entries):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl, stamp)
+            self.entries.move_to_end(key)
+            while len(self.entries) > max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.stamps.clear()
+
+
+_near_caches = {}
+_near_caches_lock = threading.Lock()
+
+
+def get_near_cache(name):
+    with _near_caches_lock:
+        return _near_caches.setdefault(name, NearCache())
+
+
+class TieredCache(BaseCache):
+    """Двухуровневый кеш: L1 в памяти процесса поверх общего L2.
+
+    L2 - обычный кеш из settings.CACHES (Redis, файлы), общий для всех
+    воркеров. Чтение сначала идёт в L1, запись - в оба уровня. Запись
+    L1 помечена штампом пространства ключа из L2; delete и incr в любом
+    воркере меняют штамп только своего пространства, и остальные
+    воркеры сбрасывают в L1 его записи не позже чем через
+    STAMP_INTERVAL секунд. Так сдвиг поколений лент при каждой записи
+    поста не вымывает из L1 карточки и миниатюры. Перезаписанные через set
+    значения живут в L1 не дольше L1_TIMEOUT, поэтому всё, что должно
+    меняться сразу, версионируется ключом или счётчиком поколения.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.l2_alias = options.get('L2', 'shared')
+        self.l1_max_entries = int(options.get('L1_MAX_ENTRIES', 1000))
+        self.l1_timeout = float(options.get('L1_TIMEOUT', 30))
+        self.stamp_interval = float(options.get('STAMP_INTERVAL', 1))
+        self.near = get_near_cache(location or 'default')
+
+    @property
+    def l2(self):
+        return caches[self.l2_alias]
+
+    def current_stamps(self, keys):
+        """Штампы пространств ключей; устаревшие читаются одним get_many."""
+        near = self.near
+        now = time.monotonic()
+        namespaces = {get_namespace(key) for key in keys}
+        stamps = {}
+        stale = []
+        for namespace in namespaces:
+            stamp, checked = near.stamps.get(namespace, (None, 0.0))
+            if stamp is None or now - checked >= self.stamp_interval:
+                stale.append(namespace)
+            else:
+                stamps[namespace] = stamp
+        if stale:
+            stamp_keys = {STAMP_KEY.format(name): name for name in stale}
+            fetched = self.l2.get_many(list(stamp_keys))
+            for stamp_key, namespace in stamp_keys.items():
+                stamp = fetched.get(stamp_key)
+                if stamp is None:
+                    self.l2.add(stamp_key, time.time_ns(), None)
+                    stamp = self.l2.get(stamp_key)
+                stamps[namespace] = stamp
+                near.stamps[namespace] = (stamp, now)
+        return stamps
+
+    def current_stamp(self, key):
+        return self.current_stamps([key])[get_namespace(key)]
+
+    def bump_stamps(self, keys):
+        for namespace in {get_namespace(key) for key in keys}:
+            stamp_key = STAMP_KEY.format(namespace)
+            try:
+                stamp = self.l2.incr(stamp_key)
+            except ValueError:
+                self.l2.add(stamp_key, time.time_ns(), None)
+                stamp = self.l2.get(stamp_key)
+            self.near.stamps[namespace] = (stamp, time.monotonic())
+
+    def remember(self, key, value, stamp, timeout=DEFAULT_TIMEOUT):
+        ttl = self.l1_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            ttl = min(ttl, timeout)
+        if ttl > 0:
+            self.near.set(key, value, ttl, stamp, self.l1_max_entries)
+
+    def get(self, key, default=None, version=None):
+        near_key = self.make_key(key, version)
+        stamp = self.current_stamp(key)
+        value = self.near.get(near_key, stamp)
+        if value is not MISSING:
+            return value
+        value = self.l2.get(key, MISSING, version)
+        if value is MISSING:
+            return default
+        self.remember(near_key, value, stamp)
+        return value
+
+    def get_many(self, keys, version=None):
+        stamps = self.current_stamps(keys)
+        found = {}
+        missed = []
+        for key in keys:
+            value = self.near.get(
+                self.make_key(key, version), stamps[get_namespace(key)]
+            )
+            if value is MISSING:
+                missed.append(key)
+            else:
+                found[key] = value
+        if missed:
+            fetched = self.l2.get_many(missed, version)
+            for key, value in fetched.items():
+                self.remember(
+                    self.make_key(key, version), value,
+                    stamps[get_namespace(key)],
+                )
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        stamp = self.current_stamp(key)
+        self.l2.set(key, value, timeout, version)
+        self.remember(self.make_key(key, version), value, stamp, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        stamp = self.current_stamp(key)
+        added = self.l2.add(key, value, timeout, version)
+        if added:
+            self.remember(self.make_key(key, version), value, stamp, timeout)
+        return added
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        stamps = self.current_stamps(data)
+        failed = self.l2.set_many(data, timeout, version)
+        for key, value in data.items():
+            if key not in failed:
+                self.remember(
+                    self.make_key(key, version), value,
+                    stamps[get_namespace(key)], timeout,
+                )
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.l2.touch(key, timeout, version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version) is not MISSING
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version)
+        self.near.delete(self.make_key(key, version))
+        self.bump_stamps([key])
+        return value
+
+    def delete(self, key, version=None):
+        self.l2.delete(key, version)
+        self.near.delete(self.make_key(key, version))
+        self.bump_stamps([key])
+
+    def delete_many(self, keys, version=None):
+        self.l2.delete_many(keys, version)
+        for key in keys:
+            self.near.delete(self.make_key(key, version))
+        self.bump_stamps(keys)
+
+    def clear(self):
+        self.l2.clear()
+        self.near.clear()
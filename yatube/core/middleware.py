@@ -0,0 +1,86 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+
+from .page_cache import (fill_holes, get_page_cache, is_anonymous,
+                         is_current, page_cache_key)
+from .query_budget import QueryRecorder, get_query_budget
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetMiddleware:
+    """Логирует и помечает заголовком запросы, превысившие бюджет view."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_ENFORCE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        budget = get_query_budget(match.func) if match else None
+        if budget is None:
+            return response
+        violations = recorder.violations(budget)
+        if violations:
+            logger.warning(
+                '%s %s is over its query budget: %s\n%s',
+                request.method, request.path, ', '.join(violations),
+                recorder.report(),
+            )
+            response['X-Query-Budget'] = 'exceeded'
+        return response
+
+
+class PageCacheMiddleware:
+    """Отдаёт страницы целиком из кеша, не доходя до view.
+
+    Анонимный запрос, попавший в кеш, не трогает ни сессию, ни ORM,
+    ни шаблоны. Авторизованным тело отдаётся только для view с
+    shared=True, шапка при этом рендерится под пользователя.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return self.get_response(request)
+        policy = get_page_cache(match.func)
+        anonymous = is_anonymous(request)
+        if policy is None or not (anonymous or policy.shared):
+            return self.get_response(request)
+        key = page_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None and is_current(cached[2]):
+            content_type, content, _ = cached
+            if not anonymous:
+                request.resolver_match = match
+                content = fill_holes(content, request)
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Page-Cache'] = 'hit'
+        else:
+            response = self.get_response(request)
+            if (anonymous and response.status_code == 200
+                    and not response.streaming and not response.cookies):
+                cache.set(key, (
+                    response['Content-Type'],
+                    response.content.decode(response.charset),
+                    getattr(request, 'page_versions', {}),
+                ), policy.timeout)
+        patch_vary_headers(response, ('Cookie',))
+        return response
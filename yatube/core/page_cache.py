@@ -0,0 +1,79 @@
+import hashlib
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+
+PageCachePolicy = namedtuple('PageCachePolicy', ('timeout', 'shared'))
+
+HOLE = '<!--hole:{name}-->{content}<!--/hole-->'
+HOLE_RE = re.compile(r'<!--hole:(?P<name>[\w./-]+)-->.*?<!--/hole-->', re.S)
+
+
+def page_cache(timeout=None, shared=False):
+    """Кеширует ответ view целиком для анонимных запросов.
+
+    shared=True означает, что кроме шапки страница от пользователя не
+    зависит: авторизованные получают то же тело из кеша, а шапка
+    рендерится для них отдельно.
+    """
+    def decorator(view):
+        view.page_cache = PageCachePolicy(timeout, shared)
+        return view
+    return decorator
+
+
+def get_page_cache(view):
+    policy = getattr(view, 'page_cache', None) or getattr(
+        getattr(view, 'view_class', None), 'page_cache', None
+    )
+    if policy is None:
+        return None
+    return PageCachePolicy(
+        policy.timeout or settings.PAGE_CACHE_TIMEOUT, policy.shared
+    )
+
+
+def is_anonymous(request):
+    """Аноним определяется по cookie, без обращения к сессии и БД."""
+    return not any(
+        name in request.COOKIES
+        for name in (settings.SESSION_COOKIE_NAME, 'messages')
+    )
+
+
+def add_versions(request, versions):
+    """Отмечает версии данных, из которых view собирает страницу.
+
+    versions - словарь {ключ кеша: значение}, обычно поколения лент.
+    Страница из кеша годна, пока все эти ключи хранят те же значения,
+    поэтому запись в одну ленту не сбрасывает страницы остальных.
+    """
+    if not hasattr(request, 'page_versions'):
+        request.page_versions = {}
+    request.page_versions.update(versions)
+
+
+def is_current(versions):
+    return not versions or cache.get_many(list(versions)) == versions
+
+
+def page_cache_key(request):
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{digest}'
+
+
+def render_hole(name, request):
+    return HOLE.format(
+        name=name, content=render_to_string(name, request=request)
+    )
+
+
+def fill_holes(content, request):
+    """Подставляет в закешированное тело фрагменты текущего пользователя."""
+    return HOLE_RE.sub(
+        lambda match: render_hole(match.group('name'), request), content
+    )
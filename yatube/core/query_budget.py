@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+from collections import Counter, namedtuple
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Node
+
+
+QueryBudget = namedtuple('QueryBudget', ('queries', 'time_ms'))
+RecordedQuery = namedtuple('RecordedQuery', ('sql', 'time_ms', 'origin'))
+
+
+def query_budget(queries, time_ms=None):
+    """Объявляет бюджет view: максимум запросов и суммарного времени БД."""
+    def decorator(view):
+        view.query_budget = QueryBudget(queries, time_ms)
+        return view
+    return decorator
+
+
+def get_query_budget(view):
+    budget = getattr(view, 'query_budget', None) or getattr(
+        getattr(view, 'view_class', None), 'query_budget', None
+    )
+    if budget is None:
+        return None
+    return QueryBudget(
+        budget.queries, budget.time_ms or settings.QUERY_BUDGET_TIME_MS
+    )
+
+
+BUDGET_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('query_budget.py', 'middleware.py', 'testing.py')
+}
+
+
+def is_project_file(filename):
+    return (
+        filename.startswith(settings.BASE_DIR)
+        and filename not in BUDGET_FILES
+        and 'site-packages' not in filename
+    )
+
+
+def query_origin(frame):
+    """Строка шаблона и строка кода проекта, выполнившие запрос."""
+    code_line = None
+    while frame is not None:
+        node = frame.f_locals.get('self')
+        # type() вместо isinstance(): ленивые объекты вроде request.user
+        # не должны вычисляться (и делать запросы) при разборе стека.
+        if issubclass(type(node), Node) and getattr(node, 'token', None):
+            template_line = (
+                f'{node.origin.template_name}:{node.token.lineno}'
+            )
+            if code_line is None:
+                return template_line
+            return f'{template_line} -> {code_line}'
+        filename = frame.f_code.co_filename
+        if code_line is None and is_project_file(filename):
+            code_line = (
+                f'{os.path.relpath(filename, settings.BASE_DIR)}'
+                f':{frame.f_lineno}'
+            )
+        frame = frame.f_back
+    return code_line or 'unknown'
+
+
+class QueryRecorder:
+    def __init__(self, capture_origin=True):
+        self.capture_origin = capture_origin
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(RecordedQuery(
+                sql,
+                (time.monotonic() - start) * 1000,
+                query_origin(sys._getframe(1))
+                if self.capture_origin else None,
+            ))
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    @property
+    def total_time_ms(self):
+        return sum(query.time_ms for query in self.queries)
+
+    def violations(self, budget):
+        violations = []
+        if len(self.queries) > budget.queries:
+            violations.append(
+                f'{len(self.queries)} queries (budget {budget.queries})'
+            )
+        if budget.time_ms is not None and self.total_time_ms > budget.time_ms:
+            violations.append(
+                f'{self.total_time_ms:.1f} ms in DB '
+                f'(budget {budget.time_ms} ms)'
+            )
+        return violations
+
+    def report(self):
+        origins = Counter(query.origin for query in self.queries)
+        return '\n'.join(
+            f'  {count} x {origin}' for origin, count in origins.most_common()
+        )
@@ -0,0 +1,84 @@
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+
+logger = logging.getLogger(__name__)
+
+CachedValue = namedtuple(
+    'CachedValue', ('version', 'value', 'expires', 'delta')
+)
+
+metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+def count(metric):
+    with _metrics_lock:
+        metrics[metric] += 1
+
+
+def is_fresh(cached, version, beta):
+    """Свежесть с вероятностным досрочным пересчётом (XFetch).
+
+    Чем дольше считается значение (delta) и чем ближе срок, тем выше
+    шанс, что очередной запрос пересчитает его до истечения TTL.
+    """
+    if cached is None or cached.version != version:
+        return False
+    early = cached.delta * beta * -math.log(1 - random.random())
+    return time.time() + early < cached.expires
+
+
+def get_or_compute(key, version, timeout, compute, beta=1.0):
+    """Значение из кеша; пересчитывает его только один запрос.
+
+    Пока держатель блокировки пересчитывает значение, остальные
+    получают устаревшее, а при его отсутствии ждут результата.
+    """
+    locks = caches[settings.STAMPEDE_LOCK_CACHE]
+    cached = cache.get(key)
+    if is_fresh(cached, version, beta):
+        count('hits')
+        return cached.value
+    lock_key = f'{key}:lock'
+    lock_timeout = settings.STAMPEDE_LOCK_TIMEOUT
+    if locks.add(lock_key, 1, lock_timeout):
+        try:
+            # Другой воркер мог уже пересчитать значение, пока наша копия
+            # лежала в L1.
+            shared = locks.get(key)
+            if is_fresh(shared, version, 0):
+                count('hits')
+                return shared.value
+            count('recomputes')
+            start = time.time()
+            value = compute()
+            delta = time.time() - start
+            cache.set(
+                key,
+                CachedValue(version, value, time.time() + timeout, delta),
+                timeout + settings.STAMPEDE_GRACE,
+            )
+            return value
+        finally:
+            locks.delete(lock_key)
+    if cached is not None:
+        count('stale_serves')
+        return cached.value
+    count('lock_waits')
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(settings.STAMPEDE_POLL_INTERVAL)
+        shared = locks.get(key)
+        if shared is not None and shared.version == version:
+            return shared.value
+    logger.warning('Gave up waiting for %s, computing it again', key)
+    count('recomputes')
+    return compute()
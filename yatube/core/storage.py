@@ -0,0 +1,64 @@
+import hashlib
+import os
+import re
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+CONTENT_NAME_RE = re.compile(
+    r'(?:^|/)(?:[0-9a-f]{2}/)+[0-9a-f]{64}(?:\.\w+)?$'
+)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под SHA-256 их содержимого в каталогах-шардах.
+
+    posts/photo.jpg сохраняется как posts/3f/a2/3fa2….jpg: каталог из
+    upload_to и расширение остаются, имя задаёт содержимое. Одинаковые
+    файлы записываются один раз, в каталоге не больше 256 подкаталогов.
+    """
+
+    def __init__(self, *args, shard_depth=2, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_depth = shard_depth
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        shards = [
+            digest[i:i + 2] for i in range(0, self.shard_depth * 2, 2)
+        ]
+        extension = os.path.splitext(filename)[1].lower()
+        return '/'.join(filter(None, [
+            directory, *shards, f'{digest}{extension}',
+        ]))
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Свежая дата изменения защищает файл от сборщика мусора,
+            # пока новая ссылка на него не закоммичена.
+            os.utime(self.path(name))
+            return name
+        # При одновременной записи одинакового файла FileSystemStorage
+        # даст второму копию с суффиксом; её подберёт сборщик мусора.
+        return self._save(name, content)
+
+
+def is_content_name(name):
+    return bool(CONTENT_NAME_RE.search(name))
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,13 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.page_cache import HOLE
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name):
+    """Включает шаблон, который у страницы из кеша рендерится заново."""
+    included = context.template.engine.get_template(name)
+    return mark_safe(HOLE.format(name=name, content=included.render(context)))
@@ -0,0 +1,38 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.stampede import get_or_compute
+
+register = template.Library()
+
+
+class StampedeCacheNode(template.Node):
+    def __init__(self, nodelist, fragment):
+        self.nodelist = nodelist
+        self.fragment = fragment
+
+    def render(self, context):
+        fragment = self.fragment.resolve(context)
+        return mark_safe(get_or_compute(
+            fragment.key,
+            fragment.version,
+            fragment.timeout,
+            lambda: self.nodelist.render(context),
+        ))
+
+
+@register.tag
+def stampede_cache(parser, token):
+    """Кеширует блок по объекту с key, version и timeout.
+
+    В отличие от {% cache %} пересчёт истёкшего или устаревшего блока
+    делает один запрос, остальные тем временем получают старую версию.
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires exactly one argument."
+        )
+    nodelist = parser.parse(('endstampede_cache',))
+    parser.delete_first_token()
+    return StampedeCacheNode(nodelist, parser.compile_filter(bits[1]))
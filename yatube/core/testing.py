@@ -0,0 +1,21 @@
+from django.urls import resolve
+
+from .query_budget import QueryRecorder, get_query_budget
+
+
+class QueryBudgetTestMixin:
+    def assertWithinQueryBudget(self, client, url, data=None):
+        budget = get_query_budget(resolve(url).func)
+        self.assertIsNotNone(budget, f'{url} has no declared query budget')
+        # Время в БД зависит от машины, где идут тесты; его проверяет
+        # middleware на живых запросах, а тесты держат число запросов.
+        budget = budget._replace(time_ms=None)
+        recorder = QueryRecorder()
+        with recorder.record():
+            client.get(url, data)
+        violations = recorder.violations(budget)
+        if violations:
+            self.fail(
+                f'{url} is over its query budget: {", ".join(violations)}\n'
+                f'{recorder.report()}'
+            )
@@ -0,0 +1,10 @@
+import django
+
+
+def setup_django():
+    """Инициализатор дочерних процессов пула, запущенных через spawn.
+
+    Лежит отдельно от задач: модуль с моделями нельзя импортировать
+    до django.setup().
+    """
+    django.setup()
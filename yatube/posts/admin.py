@@ -1,9 +1,82 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME, ActionForm
+from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import ValidationError
+from django.template.response import TemplateResponse
 
-from .models import Group, Post
+from . import bulk
+from .autocomplete import matching_ids
+from .models import AutocompleteEntry, Comment, Follow, Group, Post, User
+from .paginators import EstimatedPaginator, estimate_count
+from .search import filter_posts
+from .widgets import AutocompleteSelect
 
 
-class PostAdmin(admin.ModelAdmin):
+class HighVolumeAdmin(admin.ModelAdmin):
+    """Список для больших таблиц: оценка числа строк вместо COUNT(*)
+    и удаление выбранного пачками вместо построчного delete_selected.
+    """
+    paginator = EstimatedPaginator
+    show_full_result_count = False
+    actions = ('delete_in_batches',)
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def delete_objects(self, queryset):
+        return bulk.delete_objects(queryset)
+
+    def delete_in_batches(self, request, queryset):
+        if request.POST.get('post'):
+            deleted = self.delete_objects(queryset)
+            self.message_user(request, f'Удалено объектов: {deleted}.')
+            return None
+        # Страница подтверждения Django перечислила бы все связанные
+        # объекты; здесь только число выбранных или его оценка.
+        selected = request.POST.getlist(ACTION_CHECKBOX_NAME)
+        select_across = request.POST.get('select_across') == '1'
+        return TemplateResponse(request, 'admin/delete_in_batches.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Вы уверены?',
+            'opts': self.model._meta,
+            'count': estimate_count(queryset) if select_across else len(
+                selected
+            ),
+            'action': request.POST['action'],
+            'select_across': select_across,
+            'selected': selected,
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+        })
+
+    delete_in_batches.short_description = 'Удалить выбранные пачками'
+    delete_in_batches.allowed_permissions = ('delete',)
+
+
+class PrefixSearchMixin:
+    """Поиск и автодополнение по индексу префиксов вместо ILIKE."""
+    autocomplete_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(
+            pk__in=matching_ids(self.autocomplete_kind, search_term)
+        ), False
+
+
+class PostActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.all(),
+        required=False,
+        label='Группа',
+        widget=AutocompleteSelect(AutocompleteEntry.GROUP),
+    )
+
+
+class PostAdmin(HighVolumeAdmin):
     list_display = (
         'pk',
         'text',
@@ -11,11 +84,97 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
+    date_hierarchy = 'pub_date'
     search_fields = ('text',)
+    # DateFieldListFilter строит только диапазоны pub_date, их
+    # обслуживает индекс post_pub_date_id_idx, как и date_hierarchy.
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    action_form = PostActionForm
+    actions = ('move_to_group', 'delete_in_batches')
+
+    class Media:
+        js = ('posts/js/autocomplete.js',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо ILIKE по всей таблице — тот же индекс, что у поиска
+        # на сайте.
+        if not search_term.strip():
+            return queryset, False
+        return filter_posts(queryset, search_term), False
+
+    def move_to_group(self, request, queryset):
+        try:
+            group = PostActionForm.base_fields['group'].clean(
+                request.POST.get('group')
+            )
+        except ValidationError:
+            group = None
+        if group is None:
+            self.message_user(
+                request, 'Выберите группу для переноса.', messages.WARNING
+            )
+            return
+        moved = bulk.move_posts(queryset, group)
+        self.message_user(
+            request, f'Перенесено в «{group}» постов: {moved}.'
+        )
+
+    move_to_group.short_description = 'Перенести в группу'
+    move_to_group.allowed_permissions = ('change',)
+
+    def delete_objects(self, queryset):
+        return bulk.delete_posts(queryset)
+
+
+class CommentAdmin(HighVolumeAdmin):
+    list_display = (
+        'pk',
+        'text',
+        'pub_date',
+        'author',
+        'post',
+    )
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    date_hierarchy = 'pub_date'
+    empty_value_display = '-пусто-'
+
+    def delete_objects(self, queryset):
+        return bulk.delete_comments(queryset)
+
+
+class FollowAdmin(HighVolumeAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'author',
+    )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+
+    def delete_objects(self, queryset):
+        return bulk.delete_follows(queryset)
+
+
+class GroupAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    autocomplete_kind = AutocompleteEntry.GROUP
+    paginator = EstimatedPaginator
+    search_fields = ('title',)
+    ordering = ('title',)
+
+
+class PrefixSearchUserAdmin(PrefixSearchMixin, UserAdmin):
+    autocomplete_kind = AutocompleteEntry.USER
+    paginator = EstimatedPaginator
+    show_full_result_count = False
 
 
-admin.site.register(Group)
+admin.site.register(Group, GroupAdmin)
 admin.site.register(Post, PostAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.unregister(User)
+admin.site.register(User, PrefixSearchUserAdmin)
@@ -0,0 +1,165 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.urls import reverse
+
+from .models import AutocompleteEntry, Group, User
+from .paginators import decode_key, encode_key
+
+
+AUTOCOMPLETE_KEY = 'autocomplete:{kind}:{digest}'
+# Верхняя граница диапазона ключей с заданным префиксом.
+MAX_CHAR = '\U0010ffff'
+
+
+def normalize(text):
+    max_length = AutocompleteEntry._meta.get_field('key').max_length
+    return ' '.join(text.lower().replace('ё', 'е').split())[:max_length]
+
+
+def prefix_keys(*texts):
+    """Ключи индекса: весь текст и каждый его хвост с начала слова,
+    чтобы «толст» находило «Лев Толстой»."""
+    keys = set()
+    for text in texts:
+        words = normalize(text).split()
+        keys.update(' '.join(words[i:]) for i in range(len(words)))
+    return keys
+
+
+def user_entries(user):
+    full_name = user.get_full_name()
+    label = f'{full_name} (@{user.username})' if full_name else user.username
+    return [
+        AutocompleteEntry(
+            key=key, kind=AutocompleteEntry.USER, object_id=user.pk,
+            label=label, target=user.username,
+        )
+        for key in prefix_keys(user.username, full_name)
+    ]
+
+
+def group_entries(group):
+    return [
+        AutocompleteEntry(
+            key=key, kind=AutocompleteEntry.GROUP, object_id=group.pk,
+            label=group.title, target=group.slug,
+        )
+        for key in prefix_keys(group.title, group.slug)
+    ]
+
+
+ENTRIES = {
+    AutocompleteEntry.USER: user_entries,
+    AutocompleteEntry.GROUP: group_entries,
+}
+
+
+def forget(kind, object_ids):
+    AutocompleteEntry.objects.filter(
+        kind=kind, object_id__in=object_ids
+    ).delete()
+
+
+def index_objects(kind, objects):
+    """Заменяет записи индекса объектов одного типа."""
+    with transaction.atomic():
+        forget(kind, [obj.pk for obj in objects])
+        AutocompleteEntry.objects.bulk_create(
+            entry for obj in objects for entry in ENTRIES[kind](obj)
+        )
+
+
+def entry_url(entry):
+    if entry.kind == AutocompleteEntry.USER:
+        return reverse('posts:profile', args=[entry.target])
+    return reverse('posts:groups', args=[entry.target])
+
+
+def prefix_range(prefix):
+    return {'key__gte': prefix, 'key__lt': prefix + MAX_CHAR}
+
+
+def matching_ids(kind, query):
+    """Подзапрос id объектов, чей ключ начинается с запроса."""
+    return AutocompleteEntry.objects.filter(
+        kind=kind, **prefix_range(normalize(query))
+    ).values('object_id')
+
+
+def lookup(prefix, kind=None, after=None, limit=None):
+    """Записи индекса, ключ которых начинается с prefix.
+
+    Префикс превращается в диапазон [prefix, prefix + MAX_CHAR): так
+    запрос в любой СУБД идёт по B-tree (key, id) и останавливается на
+    limit строках, а следующая страница продолжается с ключа (key, id).
+    """
+    limit = limit or settings.AUTOCOMPLETE_LIMIT
+    entries = AutocompleteEntry.objects.filter(**prefix_range(prefix))
+    if kind:
+        entries = entries.filter(kind=kind)
+    if after:
+        key, pk = after
+        entries = entries.filter(Q(key__gt=key) | Q(key=key, id__gt=pk))
+    return list(entries.order_by('key', 'id')[:limit + 1])
+
+
+def complete(query, kind=None, after=None):
+    """Подсказки по префиксу; ответ кешируется на префикс и страницу.
+
+    Записи одного объекта под разными ключами схлопываются в одну.
+    """
+    prefix = normalize(query)
+    if not prefix:
+        return {'results': [], 'next': None}
+    digest = hashlib.md5(f'{prefix}\0{after or ""}'.encode()).hexdigest()
+    cache_key = AUTOCOMPLETE_KEY.format(kind=kind or 'all', digest=digest)
+    response = cache.get(cache_key)
+    if response is not None:
+        return response
+    limit = settings.AUTOCOMPLETE_LIMIT
+    entries = lookup(prefix, kind, after and decode_key(after, str), limit)
+    page = entries[:limit]
+    seen = set()
+    results = []
+    for entry in page:
+        if (entry.kind, entry.object_id) in seen:
+            continue
+        seen.add((entry.kind, entry.object_id))
+        results.append({
+            'kind': entry.kind,
+            'id': entry.object_id,
+            'label': entry.label,
+            'url': entry_url(entry),
+        })
+    response = {
+        'results': results,
+        'next': (
+            encode_key(page[-1].key, page[-1].pk)
+            if len(entries) > limit else None
+        ),
+    }
+    cache.set(cache_key, response, settings.AUTOCOMPLETE_CACHE_TIMEOUT)
+    return response
+
+
+def rebuild_index(batch_size=1000):
+    """Переиндексирует пользователей и группы пачками по pk."""
+    indexed = 0
+    for kind, queryset in (
+        (AutocompleteEntry.USER, User.objects.all()),
+        (AutocompleteEntry.GROUP, Group.objects.all()),
+    ):
+        queryset = queryset.order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            index_objects(kind, batch)
+            indexed += len(batch)
+            last_pk = batch[-1].pk
+    return indexed
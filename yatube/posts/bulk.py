@@ -0,0 +1,144 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import counters, feed_cache, media, tags, timelines
+from .models import Comment, Follow, Post
+
+
+def batches(queryset, batch_size=None):
+    """Списки pk объектов queryset пачками по возрастанию pk.
+
+    Следующая пачка читается после обработки предыдущей, поэтому
+    обход переживает удаление и изменение уже пройденных строк.
+    """
+    batch_size = batch_size or settings.ADMIN_BULK_BATCH_SIZE
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        batch = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1]
+
+
+def count_by(queryset, field):
+    return queryset.values_list(field).annotate(
+        count=Count('pk')
+    ).order_by()
+
+
+def raw_delete(queryset):
+    # Один DELETE без загрузки строк и без сигналов post_delete: счётчики
+    # и кеши вызывающий код сдвигает сам, сразу на всю пачку.
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_objects(queryset, batch_size=None):
+    """Удаляет объекты пачками обычным delete() с сигналами и каскадом.
+
+    Для моделей без своей пакетной бухгалтерии: пачка ограничивает
+    размер транзакции и число строк, загружаемых Collector.
+    """
+    deleted = 0
+    for pks in batches(queryset, batch_size):
+        with transaction.atomic():
+            _, counts = queryset.model._base_manager.filter(
+                pk__in=pks
+            ).delete()
+        deleted += counts.get(queryset.model._meta.label, 0)
+    return deleted
+
+
+def move_posts(queryset, group, batch_size=None):
+    """Переносит посты в группу UPDATE-запросами по пачкам."""
+    moved = 0
+    for pks in batches(queryset, batch_size):
+        posts = Post.objects.filter(pk__in=pks).exclude(group=group)
+        with transaction.atomic():
+            old_groups = list(count_by(posts, 'group_id'))
+            changed = posts.update(group=group, updated_at=timezone.now())
+            for group_id, count in old_groups:
+                counters.increment_group(group_id, -count)
+            counters.increment_group(group.pk, changed)
+        moved += changed
+    # Группа видна на карточках всех лент, как при правке группы.
+    feed_cache.bump_generations('all')
+    return moved
+
+
+def delete_posts(queryset, batch_size=None):
+    """Удаляет посты DELETE-запросами по пачкам.
+
+    Зависимые строки удаляются так же, по post_id пачки; счётчики
+    авторов, групп, тегов и ссылок на файлы сдвигаются на итог пачки.
+    """
+    deleted = 0
+    for pks in batches(queryset, batch_size):
+        posts = Post.objects.filter(pk__in=pks)
+        with transaction.atomic():
+            authors = list(count_by(posts, 'author_id'))
+            groups = list(count_by(posts, 'group_id'))
+            images = list(count_by(posts.exclude(image=''), 'image'))
+            tags.forget_posts_tags(pks)
+            for relation in Post._meta.related_objects:
+                raw_delete(relation.related_model._base_manager.filter(
+                    **{f'{relation.field.name}__in': pks}
+                ))
+            deleted += raw_delete(posts)
+            for author_id, count in authors:
+                counters.increment_author(author_id, 'posts_count', -count)
+            for group_id, count in groups:
+                counters.increment_group(group_id, -count)
+            for name, count in images:
+                media.add_reference(name, -count)
+    feed_cache.bump_generations('all')
+    return deleted
+
+
+def delete_comments(queryset, batch_size=None):
+    """Удаляет комментарии пачками, сдвигая счётчики их постов."""
+    deleted = 0
+    for pks in batches(queryset, batch_size):
+        comments = Comment.objects.filter(pk__in=pks)
+        with transaction.atomic():
+            posts = list(count_by(comments, 'post_id'))
+            deleted += raw_delete(comments)
+            for post_id, count in posts:
+                counters.increment_post_comments(post_id, -count)
+        feed_cache.bump_generations(*{
+            f'post:{post_id}' for post_id, _ in posts
+        })
+    return deleted
+
+
+def delete_follows(queryset, batch_size=None):
+    """Удаляет подписки пачками, сдвигая счётчики и чистя ленты."""
+    deleted = 0
+    for pks in batches(queryset, batch_size):
+        follows = Follow.objects.filter(pk__in=pks)
+        with transaction.atomic():
+            removed = list(follows.only('user', 'author'))
+            authors = list(count_by(follows, 'author_id'))
+            readers = list(count_by(follows, 'user_id'))
+            deleted += raw_delete(follows)
+            for author_id, count in authors:
+                counters.increment_author(
+                    author_id, 'followers_count', -count
+                )
+            for user_id, count in readers:
+                counters.increment_author(
+                    user_id, 'following_count', -count
+                )
+            for follow in removed:
+                timelines.trim(follow.user_id, follow.author_id)
+            for author_id, count in authors:
+                timelines.restore_fan_out(author_id, count)
+        feed_cache.bump_generations(*{
+            name for follow in removed
+            for name in feed_cache.follow_names(follow)
+        })
+    return deleted
@@ -0,0 +1,119 @@
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from . import thumbnails
+from .models import Post
+
+
+Card = namedtuple('Card', ('meta', 'body'))
+
+FEED = 'feed'
+GROUP = 'group'
+DETAIL = 'detail'
+
+
+def related_stamp(post):
+    """Отпечаток подписей автора и группы, попадающих в карточку.
+
+    Правка автора или группы не трогает updated_at поста, поэтому их
+    поля входят в ключ: переименование сразу даёт новую карточку.
+    """
+    author = post.author
+    parts = [author.username, author.first_name, author.last_name]
+    if post.group_id:
+        parts += [post.group.slug, post.group.title]
+    return hashlib.md5('\0'.join(parts).encode()).hexdigest()[:12]
+
+
+def card_key(post, variant):
+    return (
+        f'card:{post.pk}:{post.updated_at.timestamp()}:'
+        f'{related_stamp(post)}:{variant}'
+    )
+
+
+def render_card(post, variant):
+    context = {
+        'post': post,
+        'hide_group': variant == GROUP,
+        'detail': variant == DETAIL,
+    }
+    return Card(
+        render_to_string('posts/includes/card_meta.html', context),
+        render_to_string('posts/includes/card_body.html', context),
+    )
+
+
+def render_missing_texts(posts):
+    """Готовит текст постов, записанных в обход save() (bulk_create)
+    и ещё не обработанных render_post_texts, одним запросом на страницу.
+    """
+    unrendered = {post.pk: post for post in posts if not post.excerpt}
+    if not unrendered:
+        return
+    for pk, text in Post.objects.filter(
+        pk__in=unrendered
+    ).values_list('pk', 'text'):
+        unrendered[pk].text = text
+        unrendered[pk].render_text()
+
+
+def attach_cards(posts, variant=FEED):
+    """Проставляет постам отрендеренные карточки post.card.
+
+    Карточки страницы читаются из кеша одним get_many; заново
+    рендерятся только посты, изменившиеся с прошлого рендера.
+    Части карточки, зависящие от пользователя, в кеш не попадают.
+    """
+    posts = list(posts)
+    keys = {post.pk: card_key(post, variant) for post in posts}
+    cached = cache.get_many(keys.values())
+    missing = [post for post in posts if keys[post.pk] not in cached]
+    render_missing_texts(missing)
+    with_images = [post for post in missing if post.image]
+    prefetch_related_objects(with_images, 'image_variants')
+    thumbnails.prefetch_thumbnails(
+        post for post in with_images if not post.image_variants.all()
+    )
+    rendered = {}
+    for post in posts:
+        card = cached.get(keys[post.pk])
+        if card is None:
+            card = rendered[keys[post.pk]] = render_card(post, variant)
+        post.card = Card(*map(mark_safe, card))
+    if rendered:
+        cache.set_many(rendered, settings.CARD_CACHE_TIMEOUT)
+    return posts
+
+
+def render_texts(batch_size=1000, rerender=False):
+    """Заполняет HTML и выдержки постов пачками по pk.
+
+    По умолчанию обрабатывает только посты без выдержки; updated_at
+    сдвигается, чтобы закешированные карточки перерисовались.
+    """
+    posts = Post.objects.order_by('pk').only('id', 'text')
+    if not rerender:
+        posts = posts.filter(excerpt='')
+    rendered = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return rendered
+        now = timezone.now()
+        for post in batch:
+            post.render_text()
+            post.updated_at = now
+        Post.objects.bulk_update(
+            batch, ('text_html', 'excerpt', 'updated_at')
+        )
+        rendered += len(batch)
+        last_pk = batch[-1].pk
@@ -0,0 +1,94 @@
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from .models import AuthorStats, Group, Post, User
+
+
+def increment(queryset, field, delta=1):
+    """Атомарно сдвигает счётчик на delta, не опуская его ниже нуля."""
+    return queryset.update(**{field: Greatest(F(field) + delta, Value(0))})
+
+
+def increment_author(user_id, field, delta=1):
+    if user_id is None:
+        return
+    stats = AuthorStats.objects.filter(user_id=user_id)
+    # Без строки уменьшать нечего, а при каскадном удалении автора
+    # новая строка сослалась бы на удаляемого пользователя.
+    if not increment(stats, field, delta) and delta > 0:
+        AuthorStats.objects.get_or_create(user_id=user_id)
+        increment(stats, field, delta)
+
+
+def increment_group(group_id, delta=1):
+    if group_id is not None:
+        increment(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def increment_post_comments(post_id, delta=1):
+    increment(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def get_author_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return AuthorStats(user=user)
+
+
+def reconcile(queryset, field, actual, batch_size):
+    """Исправляет расхождения счётчика с реальными данными пачками по pk."""
+    fixed = 0
+    last_pk = None
+    while True:
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        batch = list(batch.annotate(actual=actual).values_list(
+            'pk', field, 'actual'
+        )[:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1][0]
+        for pk, stored, count in batch:
+            if stored != count:
+                queryset.filter(pk=pk).update(**{field: count})
+                fixed += 1
+
+
+def create_missing_author_stats(batch_size):
+    created = 0
+    while True:
+        missing = list(User.objects.filter(
+            stats__isnull=True
+        ).values_list('pk', flat=True)[:batch_size])
+        if not missing:
+            return created
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(user_id=pk) for pk in missing],
+            ignore_conflicts=True,
+        )
+        created += len(missing)
+
+
+def reconcile_counters(batch_size=1000):
+    stats = AuthorStats.objects.all()
+    return {
+        'author_stats_created': create_missing_author_stats(batch_size),
+        'author_posts': reconcile(
+            stats, 'posts_count', Count('user__posts'), batch_size
+        ),
+        'author_followers': reconcile(
+            stats, 'followers_count', Count('user__following'), batch_size
+        ),
+        'author_following': reconcile(
+            stats, 'following_count', Count('user__follower'), batch_size
+        ),
+        'group_posts': reconcile(
+            Group.objects.all(), 'posts_count', Count('posts'), batch_size
+        ),
+        'post_comments': reconcile(
+            Post.objects.all(), 'comments_count', Count('comments'),
+            batch_size
+        ),
+    }
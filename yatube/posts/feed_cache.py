@@ -0,0 +1,90 @@
+import hashlib
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.page_cache import add_versions
+
+
+GENERATION_KEY = 'feed:generation:{}'
+PAGE_PARAMS = ('page', 'after', 'before')
+
+FeedFragment = namedtuple('FeedFragment', ('key', 'version', 'timeout'))
+
+
+def generation_keys(names):
+    return [GENERATION_KEY.format(name) for name in names]
+
+
+def get_generations(names):
+    """Текущие поколения лент; отсутствующие заводятся заново.
+
+    Начальное значение берётся из часов, поэтому вытесненный из кеша
+    счётчик не вернётся к старому значению и не оживит старые страницы.
+    """
+    keys = generation_keys(names)
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, time.time_ns(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def track_generations(request, names):
+    """Поколения лент, от которых зависит страница запроса; кеш
+    страниц сверяет их перед тем, как отдать сохранённую копию."""
+    generations = get_generations(names)
+    add_versions(request, dict(zip(generation_keys(names), generations)))
+    return generations
+
+
+def bump_generations(*names):
+    for key in generation_keys(names):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def feed_names(post, group_id=None):
+    names = ['index', f'profile:{post.author_id}', f'post:{post.pk}']
+    for pk in {post.group_id, group_id} - {None}:
+        names.append(f'group:{pk}')
+    return names
+
+
+def follow_names(follow):
+    # Подписка меняет кнопки в лентах читателя и счётчики на страницах
+    # обоих профилей.
+    return [
+        f'viewer:{follow.user_id}',
+        f'profile:{follow.user_id}',
+        f'profile:{follow.author_id}',
+    ]
+
+
+def feed_fragment(feed, request):
+    """Фрагмент страницы ленты: ключ по типу ленты и странице или
+    курсору, версия по поколениям.
+
+    Карточки содержат кнопки подписки, поэтому в ключ входит текущий
+    пользователь, а в версию - поколение его подписок.
+    """
+    names = ['all', feed]
+    if request.user.is_authenticated:
+        names.append(f'viewer:{request.user.pk}')
+    page = [request.GET.get(param, '') for param in PAGE_PARAMS]
+    digest = hashlib.md5(
+        ':'.join([feed, str(request.user.pk)] + page).encode()
+    ).hexdigest()
+    return FeedFragment(
+        f'feed:page:{digest}',
+        ':'.join(
+            str(generation)
+            for generation in track_generations(request, names)
+        ),
+        settings.FEED_CACHE_TIMEOUT,
+    )
@@ -0,0 +1,18 @@
+from .models import Follow
+
+
+def followed_author_ids(user, author_ids):
+    """Множество id авторов из author_ids, на которых подписан user.
+
+    Один запрос по уникальному индексу (user, author) на любое число
+    авторов.
+    """
+    if not user.is_authenticated or not author_ids:
+        return set()
+    return set(Follow.objects.filter(
+        user=user, author_id__in=set(author_ids)
+    ).values_list('author_id', flat=True))
+
+
+def is_following(user, author):
+    return author.pk in followed_author_ids(user, [author.pk])
@@ -1,6 +1,9 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Post, Comment
+from .ingest import ingest
+from .models import AutocompleteEntry, Post, Comment
+from .widgets import AutocompleteSelect
 
 
 class PostForm(forms.ModelForm):
@@ -17,6 +20,16 @@ class PostForm(forms.ModelForm):
             'group': ('Группа, к которой будет относиться пост'),
             'image': ('Картинка к посту'),
         }
+        widgets = {
+            'group': AutocompleteSelect(AutocompleteEntry.GROUP),
+        }
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # На редактировании без новой картинки здесь FieldFile поста.
+        if isinstance(image, UploadedFile):
+            return ingest(image)
+        return image
 
 
 class CommentForm(forms.ModelForm):
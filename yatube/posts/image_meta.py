@@ -0,0 +1,60 @@
+import base64
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.images import get_image_dimensions
+from PIL import Image, ImageFilter, ImageOps
+
+
+def read_dimensions(image):
+    """Ширина и высота по заголовку файла, без декодирования картинки.
+
+    Битый или недоступный файл даёт (None, None): размеры не должны
+    мешать сохранению поста.
+    """
+    if not image:
+        return None, None
+    try:
+        return get_image_dimensions(image)
+    except (OSError, SuspiciousFileOperation):
+        return None, None
+
+
+def placeholder(source):
+    """Доминирующий цвет и крошечная размытая заглушка (LQIP) в data URI."""
+    tiny = source.copy()
+    tiny.thumbnail((settings.IMAGE_LQIP_SIZE,) * 2)
+    red, green, blue = tiny.resize((1, 1), Image.BOX).getpixel((0, 0))
+    buffer = BytesIO()
+    tiny.filter(ImageFilter.GaussianBlur(1)).save(
+        buffer, format='WEBP', quality=settings.IMAGE_LQIP_QUALITY
+    )
+    lqip = base64.b64encode(buffer.getvalue()).decode()
+    return (
+        f'#{red:02x}{green:02x}{blue:02x}',
+        f'data:image/webp;base64,{lqip}',
+    )
+
+
+def open_source(image, size=None):
+    """Открывает картинку поста в RGB; size включает draft-декодирование
+    JPEG в уменьшенном масштабе."""
+    with image.open('rb') as file:
+        source = Image.open(file)
+        if size is not None:
+            source.draft('RGB', size)
+        return ImageOps.exif_transpose(source).convert('RGB')
+
+
+def capture(image):
+    """Метаданные картинки для полей поста: размеры, цвет и LQIP."""
+    width, height = read_dimensions(image)
+    size = settings.IMAGE_LQIP_SIZE * 4
+    color, lqip = placeholder(open_source(image, (size, size)))
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_color': color,
+        'image_lqip': lqip,
+    }
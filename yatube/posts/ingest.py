@@ -0,0 +1,84 @@
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+
+# Ключи Image.info с метаданными камеры и редакторов.
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp')
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 90},
+    'PNG': {'optimize': True},
+}
+
+
+def check_pixels(source):
+    """Отклоняет бомбы декомпрессии по размерам из заголовка файла."""
+    width, height = source.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: %(width)s×%(height)s точек.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+
+
+def needs_processing(source):
+    return (
+        max(source.size) > settings.IMAGE_MAX_SIDE
+        or any(key in source.info for key in METADATA_KEYS)
+    )
+
+
+def downscale(source):
+    """Уменьшает картинку до IMAGE_MAX_SIDE по большей стороне.
+
+    thumbnail() сначала вызывает draft(): JPEG декодируется сразу в
+    уменьшенном масштабе, остальные форматы уменьшаются через reduce().
+    """
+    side = settings.IMAGE_MAX_SIDE
+    source.thumbnail(
+        (side, side), reducing_gap=settings.IMAGE_INGEST_REDUCING_GAP
+    )
+    image = ImageOps.exif_transpose(source)
+    for key in METADATA_KEYS:
+        image.info.pop(key, None)
+    return image
+
+
+def ingest(upload):
+    """Готовит загруженную картинку к сохранению.
+
+    Картинка в пределах IMAGE_MAX_SIDE и без метаданных сохраняется как
+    есть. Остальные уменьшаются и перекодируются в тот же формат без
+    EXIF во временный файл, который при размере больше
+    FILE_UPLOAD_MAX_MEMORY_SIZE уходит на диск.
+    """
+    upload.seek(0)
+    source = Image.open(upload)
+    check_pixels(source)
+    if not needs_processing(source):
+        upload.seek(0)
+        return upload
+    image_format = source.format
+    image = downscale(source)
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(
+        output,
+        format=image_format,
+        exif=b'',
+        **SAVE_OPTIONS.get(image_format, {}),
+    )
+    size = output.tell()
+    output.seek(0)
+    return UploadedFile(
+        output,
+        name=upload.name,
+        content_type=getattr(upload, 'content_type', None),
+        size=size,
+    )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from posts.media import collect_garbage
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки, варианты и миниатюры, на которые не ссылается '
+        'ни один пост'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--pause', type=float, default=1.0,
+            help='Пауза между пачками удалений, секунды',
+        )
+        parser.add_argument(
+            '--grace', type=int, default=None,
+            help='Не трогать файлы моложе стольких секунд',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+
+    def handle(self, *args, **options):
+        def found(kind, name, size):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{kind}: {name} ({size} Б)')
+
+        report = collect_garbage(
+            grace=options['grace'],
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+            found=found,
+        )
+        action = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        for kind, counts in report.items():
+            self.stdout.write(
+                f'{action} {kind}: {counts["files"]} файлов, '
+                f'{counts["bytes"]} Б'
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.tags import index_tags
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет индекс #тегов по текстам постов и пересчитывает '
+        'счётчики популярных тегов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        indexed = index_tags(options['batch_size'])
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts.media import migrate_media
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище с именами по содержимому; '
+        'прерванный перенос продолжается повторным запуском'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        moved = migrate_media(options['batch_size'])
+        self.stdout.write(f'Перенесено картинок: {moved}')
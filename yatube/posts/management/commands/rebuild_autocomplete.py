@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.autocomplete import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает индекс автодополнения пользователей и групп'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        indexed = rebuild_index(options['batch_size'])
+        self.stdout.write(f'Проиндексировано объектов: {indexed}')
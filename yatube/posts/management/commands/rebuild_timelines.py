@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.timelines import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_timelines(options['batch_size'])
+        self.stdout.write(f'timelines: {rebuilt}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.cards import render_texts
+
+
+class Command(BaseCommand):
+    help = 'Заполняет сохранённый HTML и выдержки постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--all', action='store_true', dest='rerender',
+            help='Перерисовать все посты, а не только незаполненные',
+        )
+
+    def handle(self, *args, **options):
+        rendered = render_texts(options['batch_size'], options['rerender'])
+        self.stdout.write(f'Обработано постов: {rendered}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.thumbnails import warm_thumbnails
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры и заглушки картинок постов, создаёт '
+        'недостающие миниатюры и варианты'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        generated = warm_thumbnails(options['workers'], options['batch_size'])
+        self.stdout.write(f'Посты с новыми миниатюрами: {generated}')
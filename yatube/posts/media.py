@@ -0,0 +1,232 @@
+import itertools
+import logging
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from core.storage import content_storage, is_content_name
+from . import feed_cache, thumbnails
+from .models import ImageVariant, MediaFile, Post
+from .variants import VARIANTS_DIR
+
+
+logger = logging.getLogger(__name__)
+
+ORIGINALS = 'originals'
+VARIANTS = 'variants'
+THUMBNAILS = 'thumbnails'
+KINDS = (ORIGINALS, VARIANTS, THUMBNAILS)
+
+
+def add_reference(name, delta=1):
+    """Атомарно сдвигает число постов, ссылающихся на файл."""
+    if not name:
+        return
+    files = MediaFile.objects.filter(name=name)
+    changed = files.update(
+        references=Greatest(F('references') + delta, Value(0)),
+        updated_at=timezone.now(),
+    )
+    if not changed and delta > 0:
+        MediaFile.objects.get_or_create(name=name)
+        add_reference(name, delta)
+
+
+def move_image(post):
+    """Переносит картинку поста из плоского каталога в content_storage.
+
+    Возвращает False, если исходного файла нет. Старый файл удаляется
+    после коммита, когда на него не ссылается ни один пост.
+    """
+    old_name = post.image.name
+    try:
+        with content_storage.open(old_name) as source:
+            new_name = content_storage.save(old_name, source)
+    except FileNotFoundError:
+        logger.warning('Post %s image %s is missing', post.pk, old_name)
+        return False
+    with transaction.atomic():
+        if not Post.objects.filter(pk=post.pk, image=old_name).update(
+            image=new_name, updated_at=timezone.now()
+        ):
+            # Картинку успели заменить: новая уже в content_storage.
+            return False
+        ImageVariant.objects.filter(post=post, source=old_name).update(
+            source=new_name
+        )
+        add_reference(new_name)
+        add_reference(old_name, -1)
+        transaction.on_commit(lambda: delete_unreferenced(old_name))
+    return True
+
+
+def counted_references(names):
+    """Файлы, на которые по счётчику MediaFile ещё ссылаются посты."""
+    return set(MediaFile.objects.filter(
+        name__in=names, references__gt=0
+    ).values_list('name', flat=True))
+
+
+def find_referenced_originals(names):
+    # Решает счётчик; файлы с нулём дополнительно сверяются с Post.image,
+    # чтобы разошедшийся счётчик не стоил поста его картинки.
+    counted = counted_references(names)
+    return counted | set(Post.objects.filter(
+        image__in=set(names) - counted
+    ).values_list('image', flat=True))
+
+
+def delete_unreferenced(name):
+    if not find_referenced_originals([name]):
+        content_storage.delete(name)
+
+
+def migrate_media(batch_size=1000):
+    """Переносит картинки постов в content_storage пачками по pk.
+
+    Перенесённые посты пропускаются, поэтому прерванный перенос
+    продолжается повторным запуском.
+    """
+    posts = Post.objects.exclude(image='').order_by('pk').only('id', 'image')
+    moved = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        for post in batch:
+            if not is_content_name(post.image.name):
+                moved += move_image(post)
+        last_pk = batch[-1].pk
+    if moved:
+        feed_cache.bump_generations('all')
+    return moved
+
+
+def walk(directory):
+    """Файлы каталога MEDIA_ROOT по одному, без списка всего дерева."""
+    root = settings.MEDIA_ROOT
+    directories = [os.path.join(root, directory)]
+    while directories:
+        try:
+            entries = os.scandir(directories.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        name = os.path.relpath(entry.path, root)
+                        yield name.replace(os.sep, '/'), entry.stat()
+                except FileNotFoundError:
+                    continue
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def get_kind(name):
+    if name.startswith(sorl_settings.THUMBNAIL_PREFIX):
+        return THUMBNAILS
+    if name.startswith(VARIANTS_DIR):
+        return VARIANTS
+    return ORIGINALS
+
+
+def get_storage(kind, name):
+    if kind == THUMBNAILS:
+        return default.storage
+    if kind == ORIGINALS and is_content_name(name):
+        return content_storage
+    return default_storage
+
+
+def find_referenced(kind, names, released):
+    if kind == ORIGINALS:
+        return find_referenced_originals(names)
+    if kind == VARIANTS:
+        return set(ImageVariant.objects.filter(
+            file__in=names
+        ).values_list('file', flat=True))
+    return thumbnails.registered_thumbnails(names) - released
+
+
+def find_garbage(grace, chunk_size=1000, dry_run=False):
+    """Файлы без ссылок, изменённые раньше чем grace секунд назад.
+
+    Файлы и ссылки на них сверяются пачками по chunk_size. Миниатюры
+    ненужных оригиналов отвязываются от KV-хранилища sorl и попадают в
+    мусор при обходе каталога миниатюр, который идёт последним.
+    """
+    deadline = time.time() - grace
+    released = set()
+    for directory in ('posts/', sorl_settings.THUMBNAIL_PREFIX):
+        files = (
+            (name, stat.st_size) for name, stat in walk(directory)
+            if stat.st_mtime < deadline
+        )
+        for chunk in chunked(files, chunk_size):
+            by_kind = {}
+            for name, size in chunk:
+                by_kind.setdefault(get_kind(name), {})[name] = size
+            for kind, sizes in by_kind.items():
+                referenced = find_referenced(kind, list(sizes), released)
+                for name, size in sizes.items():
+                    if name in referenced:
+                        continue
+                    if kind == ORIGINALS:
+                        released |= thumbnails.release_thumbnails(
+                            name, get_storage(kind, name), dry_run
+                        )
+                    yield kind, name, size
+
+
+def delete_garbage(batch):
+    for kind, name, _ in batch:
+        get_storage(kind, name).delete(name)
+    MediaFile.objects.filter(
+        name__in=[name for kind, name, _ in batch if kind == ORIGINALS],
+        references=0,
+    ).delete()
+
+
+def collect_garbage(grace=None, batch_size=1000, pause=1.0, dry_run=False,
+                    found=None):
+    """Удаляет оригиналы, варианты и миниатюры, на которые нет ссылок.
+
+    Удаление идёт пачками по batch_size с паузой pause секунд между
+    ними. Файлы моложе grace секунд не трогаются: их пост может быть ещё
+    не закоммичен. Возвращает отчёт {вид: Counter(files=, bytes=)};
+    found вызывается для каждого найденного файла.
+    """
+    if grace is None:
+        grace = settings.MEDIA_GC_GRACE
+    report = {kind: Counter() for kind in KINDS}
+    garbage = find_garbage(grace, batch_size, dry_run)
+    for batch in chunked(garbage, batch_size):
+        for kind, name, size in batch:
+            report[kind].update(files=1, bytes=size)
+            if found is not None:
+                found(kind, name, size)
+        if dry_run:
+            continue
+        delete_garbage(batch)
+        time.sleep(pause)
+    return report
@@ -0,0 +1,72 @@
+# Generated by Django 2.2.16 on 2026-10-17 18:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    users = User.objects.annotate(
+        posts_count=models.Count('posts', distinct=True),
+        followers_count=models.Count('following', distinct=True),
+        following_count=models.Count('follower', distinct=True),
+    ).values_list(
+        'pk', 'posts_count', 'followers_count', 'following_count'
+    ).iterator()
+    AuthorStats.objects.bulk_create(
+        AuthorStats(
+            user_id=pk,
+            posts_count=posts,
+            followers_count=followers,
+            following_count=following,
+        ) for pk, posts, followers, following in users
+    )
+    relations = (
+        (Group, 'posts', 'posts_count'),
+        (Post, 'comments', 'comments_count'),
+    )
+    for model, relation, field in relations:
+        counts = list(model.objects.annotate(
+            count=models.Count(relation)
+        ).filter(count__gt=0).values_list('pk', 'count'))
+        for pk, count in counts:
+            model.objects.filter(pk=pk).update(**{field: count})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0018_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-17 19:02
+
+from django.db import migrations, models
+
+
+def use_c_collation(apps, schema_editor):
+    # С побайтовой сортировкой обычный B-tree по ключу обслуживает и
+    # диапазон префикса, и ORDER BY; text_pattern_ops умеет только первое.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE posts_autocompleteentry '
+            'ALTER COLUMN key TYPE varchar(150) COLLATE "C"'
+        )
+
+
+def use_default_collation(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE posts_autocompleteentry '
+            'ALTER COLUMN key TYPE varchar(150) COLLATE "default"'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0028_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutocompleteEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=150, verbose_name='Ключ')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('group', 'Группа')], max_length=5, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Id объекта')),
+                ('label', models.CharField(max_length=255, verbose_name='Подпись')),
+                ('target', models.CharField(max_length=150, verbose_name='Имя пользователя или slug группы')),
+            ],
+            options={
+                'verbose_name': 'Запись автодополнения',
+                'verbose_name_plural': 'Индекс автодополнения',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='autocompleteentry',
+            index=models.Index(fields=['key', 'id'], name='autocomplete_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='autocompleteentry',
+            index=models.Index(fields=['kind', 'key', 'id'], name='autocomplete_kind_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='autocompleteentry',
+            index=models.Index(fields=['kind', 'object_id'], name='autocomplete_object_idx'),
+        ),
+        migrations.RunPython(use_c_collation, use_default_collation),
+    ]
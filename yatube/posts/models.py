@@ -1,11 +1,18 @@
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
 
 from core.models import PubDateModel
+from core.storage import content_storage
+from .image_meta import read_dimensions
 
 
 User = get_user_model()
 
+EXCERPT_LENGTH = 280
+
 
 class Group(models.Model):
     title = models.CharField(
@@ -18,6 +25,11 @@ class Group(models.Model):
         unique=True
     )
     description = models.TextField(verbose_name='Описание')
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число постов'
+    )
 
     class Meta:
         verbose_name = 'Группа'
@@ -49,17 +61,115 @@ class Post(PubDateModel):
     image = models.ImageField(
         verbose_name='Картинка',
         upload_to='posts/',
+        storage=content_storage,
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число комментариев'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    text_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='HTML текста'
+    )
+    excerpt = models.CharField(
+        max_length=EXCERPT_LENGTH,
+        blank=True,
+        editable=False,
+        verbose_name='Выдержка'
+    )
+    image_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Ширина картинки'
+    )
+    image_height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Высота картинки'
+    )
+    image_color = models.CharField(
+        max_length=7,
+        blank=True,
+        editable=False,
+        verbose_name='Основной цвет картинки'
+    )
+    image_lqip = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Заглушка картинки'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='post_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('group', '-pub_date', '-id'),
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_pub_date_idx',
+            ),
+        )
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Исходная группа нужна счётчикам, чтобы при смене группы
+        # перенести пост из одного счётчика в другой.
+        if 'group_id' in post.__dict__:
+            post.loaded_group_id = post.group_id
+        if 'image' in post.__dict__:
+            post.loaded_image = post.image.name
+        return post
+
+    def render_text(self):
+        """Готовит HTML текста и выдержку для карточек ленты."""
+        self.text_html = linebreaksbr(self.text, autoescape=True)
+        self.excerpt = Truncator(self.text).chars(EXCERPT_LENGTH)
+
+    def read_image_dimensions(self):
+        """Размеры новой картинки по заголовку; цвет и LQIP позже
+        посчитает пул обработки картинок."""
+        self.image_width, self.image_height = read_dimensions(self.image)
+        self.image_color = ''
+        self.image_lqip = ''
+
+    def save(self, *args, **kwargs):
+        # Сохраняется любой путь записи: PostForm, админка, скрипты.
+        deferred = self.get_deferred_fields()
+        if 'text' not in deferred:
+            self.render_text()
+        if 'image' not in deferred and (
+            self.image.name != getattr(self, 'loaded_image', '')
+        ):
+            self.read_image_dimensions()
+        super().save(*args, **kwargs)
+
 
 class Comment(PubDateModel):
     post = models.ForeignKey(
@@ -80,6 +190,12 @@ class Comment(PubDateModel):
 
     class Meta:
         ordering = ('pub_date',)
+        indexes = (
+            models.Index(
+                fields=('pub_date', 'id'),
+                name='comment_pub_date_idx',
+            ),
+        )
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         get_latest_by = 'pub_date'
@@ -103,5 +219,284 @@ class Follow(models.Model):
     )
 
     class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+        )
         verbose_name = 'Подписка',
         verbose_name_plural = 'Подписки'
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число подписок'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+
+class TimelineEntry(models.Model):
+    follower = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата Публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('follower', 'post'),
+                name='unique_timeline_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('follower', '-pub_date', '-post'),
+                name='timeline_follower_idx',
+            ),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+
+
+class ImageVariant(models.Model):
+    WEBP = 'webp'
+    JPEG = 'jpeg'
+    FORMATS = (
+        (WEBP, 'WebP'),
+        (JPEG, 'JPEG'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+        verbose_name='Пост'
+    )
+    source = models.CharField(
+        max_length=255,
+        verbose_name='Исходная картинка'
+    )
+    format = models.CharField(
+        max_length=4,
+        choices=FORMATS,
+        verbose_name='Формат'
+    )
+    width = models.PositiveIntegerField(verbose_name='Ширина')
+    height = models.PositiveIntegerField(verbose_name='Высота')
+    file = models.FileField(
+        max_length=255,
+        verbose_name='Файл'
+    )
+    size = models.PositiveIntegerField(verbose_name='Размер в байтах')
+
+    class Meta:
+        ordering = ('format', 'width')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('post', 'format', 'width'),
+                name='unique_image_variant',
+            ),
+        )
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+
+    def __str__(self):
+        return f'{self.file.name} ({self.size} Б)'
+
+
+class MediaFile(models.Model):
+    """Счётчик ссылок постов на файл картинки в content_storage."""
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Файл'
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число ссылок'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class SearchTerm(models.Model):
+    """Обратный индекс поиска для баз без tsvector (SQLite)."""
+    term = models.CharField(
+        max_length=50,
+        verbose_name='Основа слова'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+    count = models.PositiveIntegerField(verbose_name='Число вхождений')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('term', 'post'),
+                name='unique_search_term',
+            ),
+        )
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+
+    def __str__(self):
+        return f'{self.term} → {self.post_id}'
+
+
+class Tag(models.Model):
+    name = models.CharField(
+        max_length=50,
+        unique=True,
+        verbose_name='Название'
+    )
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Индекс постов по тегам для лент /tag/<name>/."""
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='entries',
+        verbose_name='Тег'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='tag_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата Публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('tag', 'post'),
+                name='unique_post_tag',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('tag', '-pub_date', '-post'),
+                name='post_tag_feed_idx',
+            ),
+        )
+        verbose_name = 'Тег поста'
+        verbose_name_plural = 'Теги постов'
+
+
+class TagCount(models.Model):
+    """Число постов с тегом, опубликованных за час."""
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name='counts',
+        verbose_name='Тег'
+    )
+    hour = models.DateTimeField(verbose_name='Час')
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число постов'
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('tag', 'hour'),
+                name='unique_tag_count',
+            ),
+        )
+        indexes = (
+            models.Index(fields=('hour',), name='tag_count_hour_idx'),
+        )
+        verbose_name = 'Счётчик тега'
+        verbose_name_plural = 'Счётчики тегов'
+
+
+class AutocompleteEntry(models.Model):
+    """Отсортированный индекс префиксов имён пользователей и групп."""
+    USER = 'user'
+    GROUP = 'group'
+    KINDS = (
+        (USER, 'Пользователь'),
+        (GROUP, 'Группа'),
+    )
+
+    key = models.CharField(max_length=150, verbose_name='Ключ')
+    kind = models.CharField(
+        max_length=5,
+        choices=KINDS,
+        verbose_name='Тип'
+    )
+    object_id = models.PositiveIntegerField(verbose_name='Id объекта')
+    label = models.CharField(max_length=255, verbose_name='Подпись')
+    target = models.CharField(
+        max_length=150,
+        verbose_name='Имя пользователя или slug группы'
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('key', 'id'), name='autocomplete_key_idx'),
+            models.Index(
+                fields=('kind', 'key', 'id'),
+                name='autocomplete_kind_key_idx',
+            ),
+            models.Index(
+                fields=('kind', 'object_id'),
+                name='autocomplete_object_idx',
+            ),
+        )
+        verbose_name = 'Запись автодополнения'
+        verbose_name_plural = 'Индекс автодополнения'
+
+    def __str__(self):
+        return f'{self.key} → {self.kind}:{self.object_id}'
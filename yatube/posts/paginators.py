@@ -0,0 +1,268 @@
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+CURSOR_ORDERING = ('-pub_date', '-id')
+ELLIPSIS = '…'
+
+
+def planner_estimate(queryset):
+    """Оценка числа строк по статистике планировщика PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_count(object_list):
+    if not hasattr(object_list, 'query'):
+        return len(object_list)
+    estimate = planner_estimate(object_list)
+    if (estimate is not None
+            and estimate >= settings.PAGINATOR_EXACT_COUNT_LIMIT):
+        return estimate
+    sql, params = object_list.query.sql_with_params()
+    key = 'paginator:count:' + hashlib.md5(
+        f'{object_list.db}:{sql}:{params!r}'.encode()
+    ).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = object_list.count()
+        cache.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+    return count
+
+
+def encode_key(value, pk):
+    raw = f'{value}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_key(token, parse):
+    """Пара (parse(значение), id) или None для битого токена."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = raw.decode().rsplit('|', 1)
+        value = parse(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+def encode_cursor(post):
+    return encode_key(post.pub_date.isoformat(), post.pk)
+
+
+def decode_cursor(token):
+    """Возвращает пару (pub_date, id) или None для битого токена."""
+    return decode_key(token, parse_datetime)
+
+
+def keyset_filter(queryset, key=None, newer=False, id_field='id',
+                  key_field='pub_date'):
+    """Строки строго новее (newer) или старше ключа (pub_date, id).
+
+    Результат отсортирован в направлении обхода: от ключа вверх для
+    newer=True и от ключа вниз иначе. key_field задаёт другое поле
+    сортировки, например ранг в результатах поиска.
+    """
+    lookup = 'gt' if newer else 'lt'
+    direction = '' if newer else '-'
+    queryset = queryset.order_by(
+        f'{direction}{key_field}', f'{direction}{id_field}'
+    )
+    if key is None:
+        return queryset
+    value, pk = key
+    return queryset.filter(
+        Q(**{f'{key_field}__{lookup}': value})
+        | Q(**{key_field: value, f'{id_field}__{lookup}': pk})
+    )
+
+
+class EstimatedPaginator(Paginator):
+    """Paginator для больших таблиц.
+
+    Вместо точного COUNT(*) берёт оценку планировщика (PostgreSQL) или
+    закешированный подсчёт, ограничивает глубину страниц и отдаёт
+    только окно номеров вокруг текущей страницы.
+    """
+
+    def __init__(self, *args, max_pages=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_pages = max_pages or settings.PAGINATOR_MAX_PAGES
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+    @cached_property
+    def num_pages(self):
+        return min(super().num_pages, self.max_pages)
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        if number > self.max_pages:
+            raise EmptyPage('That page number is beyond the depth limit')
+        return number
+
+    def page(self, number):
+        # Оценка числа строк может быть неточной, поэтому наличие следующей
+        # страницы определяется лишней строкой в выборке, а num_pages
+        # уточняется по факту.
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        if not object_list and number > 1:
+            raise EmptyPage('That page contains no results')
+        if len(object_list) > self.per_page:
+            self.num_pages = min(
+                max(self.num_pages, number + 1), self.max_pages
+            )
+        else:
+            self.num_pages = number
+        page = self._get_page(object_list[:self.per_page], number, self)
+        page.elided_page_range = list(self.get_elided_page_range(number))
+        return page
+
+    def get_page(self, number):
+        # В отличие от Paginator.get_page пустую страницу здесь выясняет
+        # только page(), поэтому откат на последнюю страницу — после неё.
+        try:
+            return self.page(number)
+        except PageNotAnInteger:
+            return self.page(1)
+        except EmptyPage:
+            pass
+        try:
+            return self.page(self.num_pages)
+        except EmptyPage:
+            # Завышенная оценка: пустой оказалась и последняя страница.
+            return self.page(1)
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=1):
+        number = min(self.validate_number(number), self.num_pages)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+class CursorPage(Sequence):
+    is_cursor = True
+    encode_cursor = staticmethod(encode_cursor)
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next():
+            return self.encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return self.encode_cursor(self.object_list[0])
+        return None
+
+
+class CursorPaginator:
+    """Keyset-пагинация по (pub_date, id) без COUNT(*) и OFFSET.
+
+    Каждая страница читается одним запросом по индексу, поэтому её
+    стоимость не зависит от глубины, а новые посты не сдвигают
+    уже выданные страницы. Кроме QuerySet принимает любой объект
+    с методом keyset(key, newer, limit), например ленту подписок.
+    """
+
+    page_class = CursorPage
+    decode_cursor = staticmethod(decode_cursor)
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def fetch(self, key, newer, limit):
+        if hasattr(self.object_list, 'keyset'):
+            return self.object_list.keyset(key, newer, limit)
+        return list(keyset_filter(self.object_list, key, newer)[:limit])
+
+    def get_page(self, after=None, before=None):
+        after = self.decode_cursor(after)
+        before = self.decode_cursor(before)
+        if before is not None:
+            posts = self.fetch(before, True, self.per_page + 1)
+            if posts:
+                has_previous = len(posts) > self.per_page
+                posts = posts[:self.per_page][::-1]
+                return self.page_class(
+                    posts, has_next=True, has_previous=has_previous,
+                )
+            after = None
+        posts = self.fetch(after, False, self.per_page + 1)
+        return self.page_class(
+            posts[:self.per_page],
+            has_next=len(posts) > self.per_page,
+            has_previous=after is not None,
+        )
@@ -0,0 +1,156 @@
+import re
+from collections import Counter
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection, transaction
+from django.db.models import Count, F, IntegerField, Sum
+from django.db.models.functions import Cast
+
+from . import selectors
+from .models import Post, SearchTerm
+from .paginators import (CursorPage, CursorPaginator, decode_key, encode_key,
+                         keyset_filter)
+
+
+SEARCH_CONFIG = 'russian'
+WORD_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'^[а-я]+$')
+MIN_STEM = 3
+# ts_rank — float4: в курсоре и сравнениях он хранится целым числом
+# миллионных долей, чтобы граница страницы совпадала с рангом в БД.
+RANK_SCALE = 10 ** 6
+# Окончания для упрощённого стемминга индекса SQLite, длинные первыми.
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ого', 'его', 'ому',
+    'ему', 'ыми', 'ими', 'ешь', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое',
+    'ее', 'ие', 'ые', 'ую', 'юю', 'ом', 'ем', 'ам', 'ям', 'ах', 'ях', 'ов',
+    'ев', 'ия', 'ья', 'ии', 'ию', 'ть', 'ет', 'ут', 'ют', 'ит', 'ат', 'ят',
+    'ал', 'ил', 'ла', 'ли', 'ло', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю',
+    'ь', 'й',
+), key=len, reverse=True)
+
+
+def uses_tsvector():
+    return connection.vendor == 'postgresql'
+
+
+def stem(word):
+    if not CYRILLIC_RE.match(word):
+        return word
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    """Основы слов текста с числом вхождений."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return Counter(
+        stem(word)[:SearchTerm._meta.get_field('term').max_length]
+        for word in words if len(word) > 1
+    )
+
+
+def index_posts(posts):
+    """Обновляет поисковый индекс постов после изменения текста."""
+    if uses_tsvector():
+        Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+            search_vector=SearchVector('text', config=SEARCH_CONFIG)
+        )
+        return
+    with transaction.atomic():
+        SearchTerm.objects.filter(post__in=posts).delete()
+        SearchTerm.objects.bulk_create(
+            SearchTerm(post=post, term=term, count=count)
+            for post in posts
+            for term, count in tokenize(post.text).items()
+        )
+
+
+def matching_terms(query):
+    """Посты, содержащие все слова запроса, с рангом по индексу SQLite."""
+    terms = list(tokenize(query))
+    return SearchTerm.objects.filter(term__in=terms).values(
+        'post_id'
+    ).annotate(
+        rank=Sum('count'), matched=Count('term')
+    ).filter(matched=len(terms))
+
+
+def filter_posts(queryset, query):
+    """Оставляет в queryset посты, найденные по запросу."""
+    if uses_tsvector():
+        return queryset.filter(
+            search_vector=SearchQuery(query, config=SEARCH_CONFIG)
+        )
+    return queryset.filter(pk__in=matching_terms(query).values('post_id'))
+
+
+class SearchResults:
+    """Посты по запросу от более релевантных к менее релевантным.
+
+    Страницы читаются keyset-пагинацией по целому (rank, id): в
+    PostgreSQL ранг считает ts_rank по tsvector с GIN-индексом, в
+    SQLite — сумма вхождений слов запроса в обратном индексе.
+    """
+
+    def __init__(self, query):
+        self.query = query
+
+    def keyset(self, key, newer, limit):
+        if uses_tsvector():
+            query = SearchQuery(self.query, config=SEARCH_CONFIG)
+            posts = selectors.feed_posts().filter(
+                search_vector=query
+            ).annotate(rank=Cast(
+                SearchRank(F('search_vector'), query) * RANK_SCALE,
+                IntegerField(),
+            ))
+            return list(keyset_filter(
+                posts, key, newer, key_field='rank'
+            )[:limit])
+        if not tokenize(self.query):
+            return []
+        ranks = dict(keyset_filter(
+            matching_terms(self.query), key, newer,
+            id_field='post_id', key_field='rank',
+        ).values_list('post_id', 'rank')[:limit])
+        posts = selectors.feed_posts().in_bulk(ranks)
+        page = []
+        for pk, rank in ranks.items():
+            if pk in posts:
+                posts[pk].rank = rank
+                page.append(posts[pk])
+        return page
+
+
+def encode_rank_cursor(post):
+    return encode_key(post.rank, post.pk)
+
+
+class RankedPage(CursorPage):
+    encode_cursor = staticmethod(encode_rank_cursor)
+
+
+class RankedPaginator(CursorPaginator):
+    page_class = RankedPage
+
+    @staticmethod
+    def decode_cursor(token):
+        return decode_key(token, int)
+
+
+def rebuild_index(batch_size=1000):
+    """Переиндексирует все посты пачками по pk."""
+    posts = Post.objects.order_by('pk').only('id', 'text')
+    indexed = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return indexed
+        index_posts(batch)
+        indexed += len(batch)
+        last_pk = batch[-1].pk
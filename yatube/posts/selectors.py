@@ -0,0 +1,47 @@
+from django.db.models import Prefetch
+
+from .models import Comment, Post
+
+
+CARD_FIELDS = (
+    'id',
+    'excerpt',
+    'pub_date',
+    'updated_at',
+    'image',
+    'image_width',
+    'image_height',
+    'image_color',
+    'image_lqip',
+    'author',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group',
+    'group__slug',
+    'group__title',
+)
+
+
+def feed_posts():
+    """Посты с автором и группой, загруженными одним JOIN для карточек."""
+    return Post.objects.select_related('author', 'group').only(*CARD_FIELDS)
+
+
+def group_posts(group):
+    return feed_posts().filter(group=group)
+
+
+def author_posts(author):
+    return feed_posts().filter(author=author)
+
+
+def detail_post():
+    return Post.objects.select_related(
+        'author__stats', 'group'
+    ).prefetch_related(
+        Prefetch(
+            'comments',
+            queryset=Comment.objects.select_related('author'),
+        )
+    )
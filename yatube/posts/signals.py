@@ -0,0 +1,119 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import (autocomplete, counters, feed_cache, media, search, tags,
+               thumbnails, timelines)
+from .models import (AuthorStats, AutocompleteEntry, Comment, Follow, Group,
+                     Post, User)
+
+
+@receiver(post_save, sender=User)
+def create_author_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        AuthorStats.objects.get_or_create(user=instance)
+    # Вход пользователя меняет только last_login, страниц это не касается.
+    if kwargs.get('update_fields') != frozenset(['last_login']):
+        # Имя автора есть на его карточках во всех лентах.
+        if not created:
+            feed_cache.bump_generations('all')
+        autocomplete.index_objects(AutocompleteEntry.USER, [instance])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    autocomplete.forget(AutocompleteEntry.USER, [instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded_group_id = getattr(instance, 'loaded_group_id', None)
+    if created:
+        counters.increment_author(instance.author_id, 'posts_count')
+        counters.increment_group(instance.group_id)
+        timelines.fan_out(instance)
+    elif hasattr(instance, 'loaded_group_id'):
+        if loaded_group_id != instance.group_id:
+            counters.increment_group(loaded_group_id, -1)
+            counters.increment_group(instance.group_id)
+    feed_cache.bump_generations(
+        *feed_cache.feed_names(instance, loaded_group_id)
+    )
+    instance.loaded_group_id = instance.group_id
+    if 'text' not in instance.get_deferred_fields():
+        search.index_posts([instance])
+        feed_cache.bump_generations(*tags.tag_feed_names(
+            tags.update_post_tags(instance, created)
+        ))
+    if 'image' in instance.get_deferred_fields():
+        return
+    loaded_image = getattr(instance, 'loaded_image', '')
+    if instance.image.name != loaded_image:
+        media.add_reference(instance.image.name)
+        media.add_reference(loaded_image, -1)
+        thumbnails.schedule_thumbnails(instance)
+    instance.loaded_image = instance.image.name
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    instance.deleted_tag_ids = tags.forget_post_tags(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.increment_author(instance.author_id, 'posts_count', -1)
+    counters.increment_group(instance.group_id, -1)
+    if 'image' not in instance.get_deferred_fields():
+        media.add_reference(instance.image.name, -1)
+    feed_cache.bump_generations(
+        *feed_cache.feed_names(instance),
+        *tags.tag_feed_names(getattr(instance, 'deleted_tag_ids', ())),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    # Название группы есть на карточках во всех лентах.
+    if raw:
+        return
+    feed_cache.bump_generations('all')
+    if kwargs['signal'] is post_delete:
+        autocomplete.forget(AutocompleteEntry.GROUP, [instance.pk])
+    else:
+        autocomplete.index_objects(AutocompleteEntry.GROUP, [instance])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment_post_comments(instance.post_id)
+        feed_cache.bump_generations(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.increment_post_comments(instance.post_id, -1)
+    feed_cache.bump_generations(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.increment_author(instance.author_id, 'followers_count')
+        counters.increment_author(instance.user_id, 'following_count')
+        timelines.backfill(instance.user_id, instance.author_id)
+        feed_cache.bump_generations(*feed_cache.follow_names(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.increment_author(instance.author_id, 'followers_count', -1)
+    counters.increment_author(instance.user_id, 'following_count', -1)
+    timelines.trim(instance.user_id, instance.author_id)
+    timelines.restore_fan_out(instance.author_id)
+    feed_cache.bump_generations(*feed_cache.follow_names(instance))
@@ -0,0 +1,89 @@
+// Подгружает варианты <select data-autocomplete-url> по мере ввода.
+(function () {
+  'use strict';
+
+  var DELAY = 250;
+
+  function option(value, label) {
+    var element = document.createElement('option');
+    element.value = value;
+    element.textContent = label;
+    return element;
+  }
+
+  function setup(select) {
+    var search = document.createElement('input');
+    var more = document.createElement('button');
+    var timer = null;
+    var request = null;
+    var next = null;
+
+    search.type = 'search';
+    search.className = 'form-control mb-2';
+    search.placeholder = 'Начните вводить название';
+    more.type = 'button';
+    more.className = 'btn btn-link btn-sm';
+    more.textContent = 'Ещё';
+    more.hidden = true;
+    select.parentNode.insertBefore(search, select);
+    select.parentNode.insertBefore(more, select.nextSibling);
+
+    function clear() {
+      // Пустой и выбранный варианты остаются, остальные заменяются.
+      Array.prototype.slice.call(select.options).forEach(function (item) {
+        if (item.value && !item.selected) {
+          select.removeChild(item);
+        }
+      });
+    }
+
+    function load(after) {
+      var params = new URLSearchParams({
+        q: search.value,
+        kind: select.dataset.autocompleteKind,
+      });
+      if (after) {
+        params.set('after', after);
+      }
+      if (request) {
+        request.abort();
+      }
+      request = new AbortController();
+      fetch(select.dataset.autocompleteUrl + '?' + params, {
+        signal: request.signal,
+      }).then(function (response) {
+        return response.json();
+      }).then(function (data) {
+        var present = {};
+        if (!after) {
+          clear();
+        }
+        Array.prototype.forEach.call(select.options, function (item) {
+          present[item.value] = true;
+        });
+        data.results.forEach(function (item) {
+          if (!present[item.id]) {
+            select.appendChild(option(item.id, item.label));
+          }
+        });
+        next = data.next;
+        more.hidden = !next;
+      }).catch(function () {});
+    }
+
+    search.addEventListener('input', function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        load(null);
+      }, DELAY);
+    });
+    more.addEventListener('click', function () {
+      load(next);
+    });
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    var selects = document.querySelectorAll('select[data-autocomplete-url]');
+    Array.prototype.forEach.call(selects, setup);
+  });
+})();
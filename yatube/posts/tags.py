@@ -0,0 +1,206 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from . import counters, selectors
+from .models import Post, PostTag, Tag, TagCount
+from .paginators import estimate_count, keyset_filter
+
+
+TAG_RE = re.compile(r'(?<![\w#])#(\w+)')
+TOP_TAGS_KEY = 'tags:top:{limit}'
+
+
+def normalize(name):
+    max_length = Tag._meta.get_field('name').max_length
+    return name.lower().replace('ё', 'е')[:max_length]
+
+
+def extract_tags(text):
+    """Нормализованные имена #тегов текста."""
+    return {normalize(name) for name in TAG_RE.findall(text)}
+
+
+def get_tags(names):
+    """Теги по именам; недостающие создаются одним запросом."""
+    if not names:
+        return {}
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True
+    )
+    return dict(Tag.objects.filter(
+        name__in=names
+    ).values_list('name', 'id'))
+
+
+def get_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def window_start():
+    return get_hour(timezone.now()) - timedelta(
+        hours=settings.TOP_TAGS_WINDOW_HOURS - 1
+    )
+
+
+def count_tags(tag_ids, pub_date, delta=1):
+    """Сдвигает часовые счётчики тегов поста; старые часы не считаются."""
+    hour = get_hour(pub_date)
+    if hour < window_start():
+        return
+    for tag_id in tag_ids:
+        counts = TagCount.objects.filter(tag_id=tag_id, hour=hour)
+        if not counters.increment(counts, 'count', delta) and delta > 0:
+            TagCount.objects.get_or_create(tag_id=tag_id, hour=hour)
+            counters.increment(counts, 'count', delta)
+
+
+def update_post_tags(post, created=False):
+    """Приводит индекс тегов поста к его тексту.
+
+    Возвращает id всех затронутых тегов: их ленты нужно сбросить.
+    """
+    names = extract_tags(post.text)
+    current = {} if created else dict(PostTag.objects.filter(
+        post=post
+    ).values_list('tag__name', 'tag_id'))
+    removed = [current[name] for name in current.keys() - names]
+    added = get_tags(names - current.keys())
+    with transaction.atomic():
+        if removed:
+            PostTag.objects.filter(post=post, tag_id__in=removed).delete()
+            count_tags(removed, post.pub_date, -1)
+        if added:
+            PostTag.objects.bulk_create([
+                PostTag(tag_id=tag_id, post=post, pub_date=post.pub_date)
+                for tag_id in added.values()
+            ], ignore_conflicts=True)
+            count_tags(added.values(), post.pub_date)
+    return set(current.values()) | set(added.values())
+
+
+def forget_post_tags(post):
+    """Для удаляемого поста, пока каскад не удалил записи индекса.
+
+    Теги берутся из индекса, а не из текста: у поста, загруженного
+    через only()/defer(), текста может не быть.
+    """
+    tag_ids = list(PostTag.objects.filter(
+        post=post
+    ).values_list('tag_id', flat=True))
+    forget_posts_tags([post.pk])
+    return tag_ids
+
+
+def forget_posts_tags(post_ids):
+    """Снимает пачку удаляемых постов со счётчиков по индексу тегов."""
+    entries = PostTag.objects.filter(
+        post_id__in=post_ids, pub_date__gte=window_start()
+    )
+    for tag_id, hour, count in entries.annotate(
+        hour=TruncHour('pub_date')
+    ).values_list('tag_id', 'hour').annotate(count=Count('id')).order_by():
+        counters.increment(
+            TagCount.objects.filter(tag_id=tag_id, hour=hour), 'count', -count
+        )
+
+
+def tag_feed_names(tag_ids):
+    return [f'tag:{pk}' for pk in tag_ids]
+
+
+def post_tag_feed_names(post):
+    return tag_feed_names(PostTag.objects.filter(
+        post=post
+    ).values_list('tag_id', flat=True))
+
+
+def top_tags(limit=None):
+    """Популярные теги за окно TOP_TAGS_WINDOW_HOURS по часовым
+    счётчикам; результат кешируется на TOP_TAGS_CACHE_TIMEOUT."""
+    limit = limit or settings.TOP_TAGS
+    key = TOP_TAGS_KEY.format(limit=limit)
+    tags = cache.get(key)
+    if tags is None:
+        tags = list(TagCount.objects.filter(
+            hour__gte=window_start()
+        ).values_list('tag__name').annotate(
+            total=Sum('count')
+        ).filter(total__gt=0).order_by('-total', 'tag__name')[:limit])
+        cache.set(key, tags, settings.TOP_TAGS_CACHE_TIMEOUT)
+    return tags
+
+
+class TagFeed:
+    """Лента постов тега, читаемая по индексу (tag, pub_date, post)."""
+
+    def __init__(self, tag):
+        self.tag = tag
+
+    def entries(self):
+        return PostTag.objects.filter(tag=self.tag)
+
+    def load_posts(self, post_ids):
+        posts = selectors.feed_posts().in_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
+
+    def keyset(self, key, newer, limit):
+        return self.load_posts(list(keyset_filter(
+            self.entries(), key, newer, id_field='post_id'
+        ).values_list('post_id', flat=True)[:limit]))
+
+    def __len__(self):
+        return estimate_count(self.entries())
+
+    def __getitem__(self, key):
+        # Страница по номеру: OFFSET/LIMIT по индексу записей тега,
+        # посты загружаются только для самой страницы.
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        return self.load_posts(list(self.entries().order_by(
+            '-pub_date', '-post_id'
+        ).values_list('post_id', flat=True)[key]))
+
+
+def rebuild_counts():
+    """Пересчитывает часовые счётчики окна по индексу тегов."""
+    since = window_start()
+    with transaction.atomic():
+        TagCount.objects.all().delete()
+        TagCount.objects.bulk_create(
+            TagCount(tag_id=tag_id, hour=hour, count=count)
+            for tag_id, hour, count in PostTag.objects.filter(
+                pub_date__gte=since
+            ).annotate(hour=TruncHour('pub_date')).values_list(
+                'tag_id', 'hour'
+            ).annotate(count=Count('id')).order_by()
+        )
+
+
+def index_tags(batch_size=1000):
+    """Заполняет индекс тегов по существующим постам пачками по pk."""
+    posts = Post.objects.order_by('pk').only('id', 'text', 'pub_date')
+    indexed = 0
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        names = {post.pk: extract_tags(post.text) for post in batch}
+        tags = get_tags(set().union(*names.values()))
+        with transaction.atomic():
+            PostTag.objects.filter(post__in=batch).delete()
+            PostTag.objects.bulk_create(
+                PostTag(tag_id=tags[name], post=post, pub_date=post.pub_date)
+                for post in batch for name in names[post.pk]
+            )
+        indexed += len(batch)
+        last_pk = batch[-1].pk
+    rebuild_counts()
+    return indexed
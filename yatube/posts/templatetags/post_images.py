@@ -0,0 +1,44 @@
+from django import template
+
+from posts import variants as image_variants
+from posts.thumbnails import ready_thumbnail as get_ready_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(post, name):
+    """Готовая миниатюра из THUMBNAIL_GEOMETRIES или None.
+
+    Берётся из карты, собранной prefetch_thumbnails для всей страницы;
+    без неё миниатюра ищется отдельным запросом к KV-хранилищу.
+    """
+    prefetched = getattr(post, 'prefetched_thumbnails', None)
+    if prefetched is not None:
+        return prefetched.get(name)
+    return get_ready_thumbnail(post.image, name)
+
+
+@register.filter
+def srcset(variants, image_format):
+    return image_variants.srcset(variants, image_format)
+
+
+@register.filter
+def largest(variants, image_format):
+    """Самый широкий вариант формата: src для старых браузеров."""
+    matching = [
+        variant for variant in variants if variant.format == image_format
+    ]
+    return matching[-1] if matching else None
+
+
+@register.filter
+def placeholder_style(post):
+    """Фон картинки, пока она грузится: основной цвет и размытая LQIP."""
+    if not post.image_lqip:
+        return ''
+    return (
+        f'background: {post.image_color} url({post.image_lqip}) '
+        'center / cover'
+    )
@@ -0,0 +1,144 @@
+from unittest import skipUnless
+
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..admin import HighVolumeAdmin
+from ..models import (AuthorStats, Comment, Follow, Group, Post, TagCount,
+                      User)
+
+
+POSTS_URL = reverse('admin:posts_post_changelist')
+COMMENTS_URL = reverse('admin:posts_comment_changelist')
+FOLLOWS_URL = reverse('admin:posts_follow_changelist')
+GROUP_AUTOCOMPLETE_URL = reverse('admin:posts_group_autocomplete')
+
+
+@override_settings(ADMIN_BULK_BATCH_SIZE=2)
+class HighVolumeAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='-'
+        )
+        cls.author = User.objects.create_user(username='writer')
+        cls.source = Group.objects.create(
+            title='Откуда', slug='source', description='-'
+        )
+        cls.target = Group.objects.create(
+            title='Куда', slug='target', description='-'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def create_posts(self, count):
+        return [
+            Post.objects.create(
+                author=self.author, group=self.source, text=f'#пачка {i}'
+            )
+            for i in range(count)
+        ]
+
+    def changelist_queries(self):
+        # Первый запрос прогревает сессию и закешированный подсчёт строк.
+        self.client.get(POSTS_URL)
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(POSTS_URL).status_code, 200)
+        return len(context)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.create_posts(2)
+        few = self.changelist_queries()
+        self.create_posts(10)
+        self.assertEqual(self.changelist_queries(), few)
+
+    @skipUnless(connection.vendor == 'sqlite', 'План запроса SQLite')
+    def test_date_filter_uses_pub_date_index(self):
+        self.create_posts(1)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(POSTS_URL, {
+                'pub_date__gte': '2020-01-01', 'pub_date__lt': '2030-01-01',
+            })
+        sql = next(
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT "posts_post"."id"')
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('post_pub_date_id_idx', plan)
+
+    def test_move_to_group(self):
+        posts = self.create_posts(5)
+        self.client.post(POSTS_URL, {
+            'action': 'move_to_group',
+            'index': 0,
+            'group': self.target.pk,
+            '_selected_action': [post.pk for post in posts[:3]],
+        })
+        self.assertEqual(self.target.posts.count(), 3)
+        self.assertEqual(Group.objects.get(pk=self.source.pk).posts_count, 2)
+        self.assertEqual(Group.objects.get(pk=self.target.pk).posts_count, 3)
+
+    def test_delete_in_batches_asks_first(self):
+        posts = self.create_posts(5)
+        Comment.objects.create(post=posts[0], author=self.author, text='-')
+        data = {
+            'action': 'delete_in_batches',
+            '_selected_action': [post.pk for post in posts],
+            'select_across': 1,
+        }
+        response = self.client.post(POSTS_URL, {**data, 'index': 0})
+        self.assertTemplateUsed(response, 'admin/delete_in_batches.html')
+        self.assertEqual(Post.objects.count(), 5)
+        self.client.post(POSTS_URL, {**data, 'post': 'yes'})
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 0
+        )
+        self.assertEqual(Group.objects.get(pk=self.source.pk).posts_count, 0)
+        self.assertEqual(TagCount.objects.get().count, 0)
+
+    def test_delete_comments_and_follows(self):
+        post = self.create_posts(1)[0]
+        for _ in range(3):
+            Comment.objects.create(post=post, author=self.author, text='-')
+        Follow.objects.create(user=self.admin, author=self.author)
+        self.client.post(COMMENTS_URL, {
+            'action': 'delete_in_batches',
+            'post': 'yes',
+            '_selected_action': Comment.objects.values_list('pk', flat=True),
+        })
+        self.assertEqual(Post.objects.get(pk=post.pk).comments_count, 0)
+        self.client.post(FOLLOWS_URL, {
+            'action': 'delete_in_batches',
+            'post': 'yes',
+            '_selected_action': Follow.objects.values_list('pk', flat=True),
+        })
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).followers_count, 0
+        )
+
+    def test_group_autocomplete_uses_prefix_index(self):
+        response = self.client.get(GROUP_AUTOCOMPLETE_URL, {'term': 'ку'})
+        self.assertEqual(
+            [item['id'] for item in response.json()['results']],
+            [str(self.target.pk)],
+        )
+
+    def test_default_delete_objects_runs_in_batches(self):
+        self.create_posts(3)
+        admin = HighVolumeAdmin(Post, site)
+        self.assertEqual(admin.delete_objects(Post.objects.all()), 3)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).posts_count, 0
+        )
@@ -0,0 +1,106 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..autocomplete import lookup
+from ..models import AutocompleteEntry, Group, User
+
+
+AUTOCOMPLETE_URL = reverse('posts:autocomplete')
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.leo = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Лесные ёжики', slug='hedgehogs', description='-'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def complete(self, query, **params):
+        return self.client.get(
+            AUTOCOMPLETE_URL, {'q': query, **params}
+        ).json()
+
+    def test_matches_username_name_and_group_title(self):
+        self.assertEqual(self.complete('LE')['results'], [{
+            'kind': 'user',
+            'id': self.leo.pk,
+            'label': 'Лев Толстой (@leo)',
+            'url': reverse('posts:profile', args=['leo']),
+        }])
+        self.assertEqual(
+            [item['id'] for item in self.complete('толст')['results']],
+            [self.leo.pk],
+        )
+        results = self.complete('ежи', kind='group')['results']
+        self.assertEqual(results[0]['url'], reverse(
+            'posts:groups', args=['hedgehogs']
+        ))
+        self.assertEqual(self.complete('')['results'], [])
+
+    def test_one_object_is_listed_once(self):
+        levin = User.objects.create_user(
+            username='levin', first_name='Лев', last_name='Левин'
+        )
+        self.assertEqual(
+            [item['id'] for item in self.complete('лев')['results']],
+            [levin.pk, self.leo.pk],
+        )
+
+    def test_pages_continue_after_cursor(self):
+        for i in range(15):
+            User.objects.create_user(username=f'reader{i:02}')
+        first = self.complete('reader')
+        second = self.complete('reader', after=first['next'])
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+
+    def test_results_are_cached_per_prefix(self):
+        self.complete('leo')
+        with CaptureQueriesContext(connection) as context:
+            self.complete('leo')
+        self.assertEqual(len(context), 0)
+
+    def test_index_follows_changes(self):
+        user = User.objects.get(pk=self.leo.pk)
+        user.username = 'tolstoy'
+        user.save()
+        self.assertFalse(lookup('leo'))
+        self.assertTrue(lookup('tolstoy'))
+        user.delete()
+        Group.objects.filter(pk=self.group.pk).delete()
+        self.assertFalse(AutocompleteEntry.objects.exists())
+
+    def test_rebuild_index(self):
+        AutocompleteEntry.objects.all().delete()
+        call_command('rebuild_autocomplete', batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            {entry.key for entry in lookup('', limit=10)},
+            {'leo', 'лев толстой', 'толстой', 'лесные ежики', 'ежики',
+             'hedgehogs'},
+        )
+
+    @skipUnless(connection.vendor == 'sqlite', 'План запроса SQLite')
+    def test_prefix_lookup_uses_index(self):
+        queryset = AutocompleteEntry.objects.filter(key__gte='л')
+        with connection.cursor() as cursor:
+            sql, params = queryset.order_by(
+                'key', 'id'
+            ).query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql} LIMIT 11', params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('autocomplete_key_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,145 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from about.urls import urlpatterns as about_urlpatterns
+from core.testing import QueryBudgetTestMixin
+from users.urls import urlpatterns as users_urlpatterns
+from ..cards import render_texts
+from ..models import Comment, Follow, Group, Post, PostTag, Tag, User
+from ..search import rebuild_index
+from ..urls import urlpatterns as posts_urlpatterns
+
+
+USERS = 30
+GROUPS = 5
+POSTS_PER_USER = 20
+COMMENTS = 50
+READER_USERNAME = 'reader'
+
+
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        authors = [
+            User.objects.create_user(username=f'author_{i}')
+            for i in range(USERS)
+        ]
+        groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-'
+            ) for i in range(GROUPS)
+        ]
+        Post.objects.bulk_create(
+            Post(
+                author=author,
+                group=groups[i % GROUPS],
+                text=f'Пост {i} автора {author.username}',
+            )
+            for author in authors for i in range(POSTS_PER_USER)
+        )
+        render_texts()
+        rebuild_index()
+        cls.tag = Tag.objects.create(name='бюджет')
+        PostTag.objects.bulk_create(
+            PostTag(tag=cls.tag, post=post, pub_date=post.pub_date)
+            for post in Post.objects.all()[:POSTS_PER_USER]
+        )
+        cls.author = authors[0]
+        cls.group = groups[0]
+        cls.post = cls.author.posts.first()
+        cls.reader = User.objects.create_user(username=READER_USERNAME)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=author, text='Комментарий')
+            for author in authors[:COMMENTS]
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author) for author in authors
+        )
+        cls.guest = Client()
+        cls.user = Client()
+        cls.user.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def budget_urls(self):
+        author = self.author.username
+        return {
+            'posts:main_page': [reverse('posts:main_page'), self.guest],
+            'posts:groups': [
+                reverse('posts:groups', args=[self.group.slug]), self.guest
+            ],
+            'posts:tag': [
+                reverse('posts:tag', args=[self.tag.name]), self.guest
+            ],
+            'posts:profile': [
+                reverse('posts:profile', args=[author]), self.user
+            ],
+            'posts:post_detail': [
+                reverse('posts:post_detail', args=[self.post.id]), self.user
+            ],
+            'posts:post_create': [reverse('posts:post_create'), self.user],
+            'posts:post_edit': [
+                reverse('posts:post_edit', args=[self.post.id]), self.user
+            ],
+            'posts:add_comment': [
+                reverse('posts:add_comment', args=[self.post.id]), self.user
+            ],
+            'posts:follow_index': [reverse('posts:follow_index'), self.user],
+            'posts:autocomplete': [
+                reverse('posts:autocomplete'), self.guest, {'q': 'auth'}
+            ],
+            'posts:search': [
+                reverse('posts:search'), self.user, {'q': 'пост автора'}
+            ],
+            'posts:profile_follow': [
+                reverse('posts:profile_follow', args=[author]), self.user
+            ],
+            'posts:profile_unfollow': [
+                reverse('posts:profile_unfollow', args=[author]), self.user
+            ],
+            'users:signup': [reverse('users:signup'), self.guest],
+            'users:logout': [reverse('users:logout'), Client()],
+            'users:login': [reverse('users:login'), self.guest],
+            'users:password_reset': [
+                reverse('users:password_reset'), self.guest
+            ],
+            'users:password_change': [
+                reverse('users:password_change'), self.user
+            ],
+            'about:author': [reverse('about:author'), self.guest],
+            'about:tech': [reverse('about:tech'), self.guest],
+        }
+
+    def test_every_route_has_budget_check(self):
+        routes = [
+            [posts_urlpatterns, 'posts'],
+            [users_urlpatterns, 'users'],
+            [about_urlpatterns, 'about'],
+        ]
+        budget_urls = self.budget_urls()
+        for urlpatterns, namespace in routes:
+            for pattern in urlpatterns:
+                with self.subTest(name=pattern.name):
+                    self.assertIn(f'{namespace}:{pattern.name}', budget_urls)
+
+    def test_routes_stay_within_query_budget(self):
+        for name, (url, client, *data) in self.budget_urls().items():
+            with self.subTest(name=name):
+                self.assertWithinQueryBudget(client, url, *data)
+
+    @override_settings(QUERY_BUDGET_TIME_MS=-1)
+    def test_tests_ignore_db_time(self):
+        self.assertWithinQueryBudget(
+            self.guest, reverse('posts:main_page')
+        )
+
+    @override_settings(QUERY_BUDGET_ENFORCE=True, QUERY_BUDGET_TIME_MS=-1)
+    def test_middleware_flags_over_budget_requests(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            response = Client().get(url)
+        self.assertEqual(response['X-Query-Budget'], 'exceeded')
+        self.assertIn('posts/views.py', logs.output[0])
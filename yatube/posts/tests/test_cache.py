@@ -0,0 +1,309 @@
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import stampede
+from core.cache import TieredCache
+from .. import cards, selectors
+from ..models import EXCERPT_LENGTH, Comment, Group, Post, User
+
+
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-tests',
+    },
+}
+TIERED_CACHES = {
+    **SHARED_CACHES,
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'stampede-tests',
+        'OPTIONS': {'L2': 'shared'},
+    },
+}
+
+
+def worker(name, **options):
+    return TieredCache(name, {'OPTIONS': {
+        'L2': 'shared', 'STAMP_INTERVAL': 0, **options,
+    }})
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.shared = caches['shared']
+        self.shared.clear()
+        self.first = worker('first')
+        self.second = worker('second')
+        self.first.near.clear()
+        self.second.near.clear()
+
+    def test_l1_serves_without_l2(self):
+        self.first.set('key', 'value')
+        self.shared.set('key', 'changed behind L1')
+        self.assertEqual(self.first.get('key'), 'value')
+        self.assertEqual(self.second.get('key'), 'changed behind L1')
+
+    def test_invalidation_reaches_other_workers(self):
+        self.first.set('generation', 1)
+        self.second.get('generation')
+        self.first.incr('generation')
+        self.assertEqual(self.second.get('generation'), 2)
+        self.first.delete('generation')
+        self.assertIsNone(self.second.get('generation'))
+
+    def test_invalidation_delay_is_bounded(self):
+        slow = worker('slow', STAMP_INTERVAL=60)
+        slow.near.clear()
+        slow.set('generation', 1)
+        self.first.incr('generation')
+        self.assertEqual(slow.get('generation'), 1)
+        stamp, checked = slow.near.stamps['']
+        slow.near.stamps[''] = (stamp, checked - 60)
+        self.assertEqual(slow.get('generation'), 2)
+
+    def test_writes_keep_other_namespaces_in_l1(self):
+        self.second.set('card:1', 'card')
+        self.second.set('feed:generation:all', 1)
+        self.shared.set('card:1', 'changed behind L1')
+        self.first.incr('feed:generation:all')
+        self.assertEqual(self.second.get('feed:generation:all'), 2)
+        self.assertEqual(self.second.get('card:1'), 'card')
+
+    def test_l1_is_bounded(self):
+        small = worker('small', L1_MAX_ENTRIES=2)
+        small.near.clear()
+        small.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(len(small.near.entries), 2)
+        self.assertEqual(small.get_many(['a', 'b', 'c']), {
+            'a': 1, 'b': 2, 'c': 3,
+        })
+
+
+@override_settings(CACHES=TIERED_CACHES, STAMPEDE_POLL_INTERVAL=0.01)
+class StampedeTest(SimpleTestCase):
+    REQUESTS = 200
+
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        stampede.metrics.clear()
+        self.computed = 0
+
+    def compute(self):
+        self.computed += 1
+        time.sleep(0.2)
+        return 'new'
+
+    def hammer(self):
+        barrier = threading.Barrier(self.REQUESTS)
+        results = []
+
+        def request():
+            barrier.wait()
+            results.append(stampede.get_or_compute(
+                'fragment', 'v1', 60, self.compute
+            ))
+
+        threads = [
+            threading.Thread(target=request) for _ in range(self.REQUESTS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_recompute_at_expiry(self):
+        cache.set('fragment', stampede.CachedValue(
+            'v1', 'old', time.time() - 1, 0.2
+        ))
+        results = self.hammer()
+        self.assertEqual(self.computed, 1)
+        self.assertEqual(stampede.metrics['recomputes'], 1)
+        self.assertEqual(
+            stampede.metrics['stale_serves'], self.REQUESTS - 1
+        )
+        self.assertEqual(set(results), {'old', 'new'})
+        self.assertEqual(cache.get('fragment').value, 'new')
+
+    def test_cold_cache_waits_for_one_recompute(self):
+        results = self.hammer()
+        self.assertEqual(self.computed, 1)
+        self.assertEqual(stampede.metrics['lock_waits'], self.REQUESTS - 1)
+        self.assertEqual(results, ['new'] * self.REQUESTS)
+
+    def test_new_version_is_stale(self):
+        cache.set('fragment', stampede.CachedValue(
+            'v0', 'old', time.time() + 60, 0
+        ))
+        self.assertEqual(
+            stampede.get_or_compute('fragment', 'v1', 60, self.compute),
+            'new',
+        )
+        self.assertEqual(
+            stampede.get_or_compute('fragment', 'v1', 60, self.compute),
+            'new',
+        )
+        self.assertEqual(self.computed, 1)
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        Post.objects.create(author=cls.user, text='Первый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.reader = Client()
+        self.reader.force_login(self.user)
+
+    def test_anonymous_hit_skips_orm_and_templates(self):
+        first = self.guest.get(reverse('posts:main_page'))
+        with CaptureQueriesContext(connection) as context:
+            second = self.guest.get(reverse('posts:main_page'))
+        self.assertEqual(len(context), 0)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.templates, [])
+        self.assertEqual(first.content, second.content)
+
+    def test_shared_page_gets_user_header(self):
+        url = reverse('about:author')
+        self.guest.get(url)
+        response = self.reader.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, reverse('users:logout'))
+        self.assertContains(response, self.user.username)
+        self.assertNotContains(response, reverse('users:signup'))
+
+    def test_user_specific_page_is_not_shared(self):
+        self.guest.get(reverse('posts:main_page'))
+        response = self.reader.get(reverse('posts:main_page'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_write_invalidates_pages(self):
+        self.guest.get(reverse('posts:main_page'))
+        Post.objects.create(author=self.user, text='Второй пост')
+        response = self.guest.get(reverse('posts:main_page'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, 'Второй пост')
+
+    def test_write_keeps_other_feed_pages(self):
+        first, second = [
+            Group.objects.create(title=slug, slug=slug, description='-')
+            for slug in ('first', 'second')
+        ]
+        first_url = reverse('posts:groups', args=['first'])
+        second_url = reverse('posts:groups', args=['second'])
+        self.guest.get(first_url)
+        self.guest.get(second_url)
+        Post.objects.create(author=self.user, text='В первой', group=first)
+        with CaptureQueriesContext(connection) as context:
+            response = self.guest.get(second_url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertEqual(len(context), 0)
+        response = self.guest.get(first_url)
+        self.assertFalse(response.has_header('X-Page-Cache'))
+        self.assertContains(response, 'В первой')
+
+    def test_comment_invalidates_only_its_post(self):
+        post = Post.objects.get()
+        other = Post.objects.create(author=self.user, text='Другой пост')
+        urls = [
+            reverse('posts:post_detail', args=[pk])
+            for pk in (post.pk, other.pk)
+        ]
+        for url in urls:
+            self.guest.get(url)
+        Comment.objects.create(post=post, author=self.user, text='Отзыв')
+        self.assertContains(self.guest.get(urls[0]), 'Отзыв')
+        self.assertEqual(self.guest.get(urls[1])['X-Page-Cache'], 'hit')
+
+
+class CardCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='writer')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}') for i in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def attach(self, variant=cards.FEED):
+        with mock.patch(
+            'posts.cards.render_card', wraps=cards.render_card
+        ) as render_card:
+            posts = cards.attach_cards(
+                selectors.feed_posts().order_by('pk'), variant
+            )
+        return posts, render_card.call_count
+
+    def test_only_changed_cards_are_rendered(self):
+        posts, rendered = self.attach()
+        self.assertEqual(rendered, 3)
+        self.assertIn('Пост', posts[0].card.body)
+        post = Post.objects.get(pk=posts[0].pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        posts, rendered = self.attach()
+        self.assertEqual(rendered, 1)
+        self.assertIn('Исправленный пост', posts[0].card.body)
+
+    def test_group_rename_reaches_feed(self):
+        group = Group.objects.create(
+            title='Старое название', slug='renamed', description='-'
+        )
+        Post.objects.filter(author=self.user).update(group=group)
+        url = reverse('posts:main_page')
+        self.assertContains(self.client.get(url), 'Старое название')
+        group.title = 'Новое название'
+        group.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Новое название')
+        self.assertNotContains(response, 'Старое название')
+
+    def test_author_rename_reaches_feed(self):
+        url = reverse('posts:main_page')
+        self.client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Лев'
+        user.save()
+        self.assertContains(self.client.get(url), '@Лев')
+
+    def test_variants_are_cached_separately(self):
+        self.attach()
+        _, rendered = self.attach(cards.GROUP)
+        self.assertEqual(rendered, 3)
+
+    def test_long_post_card_is_bounded(self):
+        post = Post.objects.create(
+            author=self.user, text='Очень длинный <пост>\n' * 1000
+        )
+        self.assertLessEqual(len(post.excerpt), EXCERPT_LENGTH)
+        self.assertIn('&lt;пост&gt;<br>', post.text_html)
+        posts, _ = self.attach()
+        self.assertLess(len(posts[-1].card.body), EXCERPT_LENGTH * 2)
+
+    def test_render_post_texts_backfills(self):
+        self.assertTrue(Post.objects.filter(excerpt='').exists())
+        call_command('render_post_texts', batch_size=2, stdout=StringIO())
+        self.assertFalse(Post.objects.filter(excerpt='').exists())
+        post = Post.objects.first()
+        self.assertEqual(post.excerpt, post.text)
@@ -0,0 +1,119 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+USERNAME = 'leo'
+FOLLOWER_USERNAME = 'follower'
+GROUP_SLUG = 'writers'
+GROUP2_SLUG = 'not-writers'
+POST_TEXT = 'Тестовый Текст'
+CREATE_POST_URL = reverse('posts:post_create')
+FOLLOW_URL = reverse('posts:profile_follow', args=[USERNAME])
+UNFOLLOW_URL = reverse('posts:profile_unfollow', args=[USERNAME])
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER_USERNAME)
+        cls.group = Group.objects.create(
+            title='Группа', slug=GROUP_SLUG, description='-'
+        )
+        cls.group_2 = Group.objects.create(
+            title='Группа 2', slug=GROUP2_SLUG, description='-'
+        )
+
+    def setUp(self):
+        self.author = Client()
+        self.author.force_login(self.user)
+        self.another = Client()
+        self.another.force_login(self.follower)
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(obj, field), value)
+
+    def test_post_and_comment_counters(self):
+        self.author.post(CREATE_POST_URL, {
+            'text': POST_TEXT, 'group': self.group.id,
+        })
+        post = Post.objects.get()
+        self.assertCounters(self.user.stats, posts_count=1)
+        self.assertCounters(self.group, posts_count=1)
+        self.another.post(
+            reverse('posts:add_comment', args=[post.id]), {'text': 'Ок'}
+        )
+        self.assertCounters(post, comments_count=1)
+        self.author.post(reverse('posts:post_edit', args=[post.id]), {
+            'text': POST_TEXT, 'group': self.group_2.id,
+        })
+        self.assertCounters(self.group, posts_count=0)
+        self.assertCounters(self.group_2, posts_count=1)
+        post.refresh_from_db()
+        post.delete()
+        self.assertCounters(self.user.stats, posts_count=0)
+        self.assertCounters(self.group_2, posts_count=0)
+
+    def test_follow_counters(self):
+        self.another.get(FOLLOW_URL)
+        self.assertCounters(self.user.stats, followers_count=1)
+        self.assertCounters(self.follower.stats, following_count=1)
+        self.another.get(UNFOLLOW_URL)
+        self.assertCounters(self.user.stats, followers_count=0)
+        self.assertCounters(self.follower.stats, following_count=0)
+
+    def test_reconcile_command_fixes_drift(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, group=self.group, text=POST_TEXT)
+            for _ in range(3)
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.follower, text='Ок')
+            for post in Post.objects.all()
+        )
+        Follow.objects.bulk_create(
+            [Follow(user=self.follower, author=self.user)]
+        )
+        AuthorStats.objects.filter(user=self.follower).delete()
+        call_command('reconcile_counters', batch_size=2, stdout=StringIO())
+        self.assertCounters(
+            self.user.stats, posts_count=3, followers_count=1
+        )
+        self.assertCounters(
+            AuthorStats.objects.get(user=self.follower), following_count=1
+        )
+        self.assertCounters(self.group, posts_count=3)
+        self.assertEqual(
+            list(Post.objects.values_list('comments_count', flat=True)),
+            [1, 1, 1],
+        )
+
+
+class UserDeletionTests(TransactionTestCase):
+    def test_delete_user_with_content(self):
+        user = User.objects.create_user(username=USERNAME)
+        follower = User.objects.create_user(username=FOLLOWER_USERNAME)
+        post = Post.objects.create(author=user, text=POST_TEXT)
+        Comment.objects.create(post=post, author=user, text='Ок')
+        Comment.objects.create(post=post, author=follower, text='Ок')
+        Follow.objects.create(user=follower, author=user)
+        Follow.objects.create(user=user, author=follower)
+        user_id = user.pk
+        user.delete()
+        self.assertFalse(AuthorStats.objects.filter(user_id=user_id).exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(
+            AuthorStats.objects.values_list(
+                'followers_count', 'following_count'
+            ).get(user=follower),
+            (0, 0),
+        )
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -40,6 +41,10 @@ SMALL_GIF = (
     b'\x02\x00\x01\x00\x00\x02\x02\x0C'
     b'\x0A\x00\x3B'
 )
+SMALL_GIF_HASH = hashlib.sha256(SMALL_GIF).hexdigest()
+SMALL_GIF_NAME = (
+    f'posts/{SMALL_GIF_HASH[:2]}/{SMALL_GIF_HASH[2:4]}/{SMALL_GIF_HASH}.gif'
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -114,7 +119,7 @@ class PostFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group_id, form_data['group'])
         self.assertEqual(post.author, self.user)
-        self.assertEqual(post.image, f"posts/{form_data['image']}")
+        self.assertEqual(post.image, SMALL_GIF_NAME)
 
     def test_post_edit(self):
         image2 = SimpleUploadedFile(
@@ -137,7 +142,7 @@ class PostFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group_id, form_data['group'])
         self.assertEqual(post.author, self.user)
-        self.assertEqual(post.image, f"posts/{form_data['image']}")
+        self.assertEqual(post.image, SMALL_GIF_NAME)
 
     def test_create_or_edit_post_pages_show_correct_context(self):
         responses = {
@@ -156,6 +161,16 @@ class PostFormTests(TestCase):
                     form_field = response.context['form'].fields.get(value)
                     self.assertIsInstance(form_field, expected)
 
+    def test_group_widget_renders_only_selected_group(self):
+        with self.assertNumQueries(0):
+            html = str(PostForm()['group'])
+        self.assertNotIn(GROUP_TITLE, html)
+        self.assertIn(reverse('posts:autocomplete'), html)
+        with self.assertNumQueries(1):
+            html = str(PostForm(instance=self.post)['group'])
+        self.assertIn(GROUP_TITLE, html)
+        self.assertNotIn(GROUP2_TITLE, html)
+
     def test_user_create_comment(self):
         Comment.objects.all().delete()
         form_data = {
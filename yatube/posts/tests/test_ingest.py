@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+import tracemalloc
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageFile
+
+from ..models import Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CREATE_POST_URL = reverse('posts:post_create')
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+def make_jpeg(size, exif=None):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(
+        buffer, format='JPEG', exif=exif or b''
+    )
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIDE=500)
+class ImageIngestTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='uploader')
+        cls.author = Client()
+        cls.author.force_login(cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def upload(self, content, name='photo.jpg'):
+        return self.author.post(CREATE_POST_URL, data={
+            'text': 'Пост с фотографией',
+            'image': SimpleUploadedFile(
+                name=name, content=content, content_type='image/jpeg'
+            ),
+        })
+
+    def measure_upload(self, content):
+        """Пиковая память загрузки: самый большой декодированный растр
+        Pillow (его память tracemalloc не видит) и пик Python-кучи."""
+        rasters = []
+        load = ImageFile.ImageFile.load
+
+        def recording_load(image):
+            result = load(image)
+            rasters.append(image.width * image.height * len(image.mode))
+            return result
+
+        tracemalloc.start()
+        with mock.patch.object(ImageFile.ImageFile, 'load', recording_load):
+            self.upload(content)
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return max(rasters), python_peak
+
+    def test_large_upload_is_downscaled_with_bounded_memory(self):
+        width, height = 4000, 3000
+        raster, python_peak = self.measure_upload(
+            make_jpeg((width, height))
+        )
+        full_raster = width * height * 3
+        report = (
+            f'peak per upload: raster {raster / 2**20:.1f} MiB '
+            f'of {full_raster / 2**20:.1f} MiB, '
+            f'python heap {python_peak / 2**20:.1f} MiB'
+        )
+        self.assertLessEqual(raster, full_raster / 4, report)
+        self.assertLess(python_peak, full_raster / 4, report)
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (500, 375))
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.size, (500, 375))
+
+    def test_exif_is_stripped_and_applied(self):
+        exif = Image.Exif()
+        exif[MAKE] = 'Camera'
+        exif[ORIENTATION] = 6
+        self.upload(make_jpeg((40, 20), exif.tobytes()))
+        with Image.open(Post.objects.get().image.path) as stored:
+            self.assertEqual(stored.size, (20, 40))
+            self.assertNotIn('exif', stored.info)
+            self.assertEqual(dict(stored.getexif()), {})
+
+    def test_small_clean_upload_is_stored_as_is(self):
+        content = make_jpeg((40, 20))
+        self.upload(content)
+        with open(Post.objects.get().image.path, 'rb') as stored:
+            self.assertEqual(stored.read(), content)
+
+    @override_settings(IMAGE_MAX_PIXELS=1000)
+    def test_decompression_bomb_is_rejected(self):
+        with mock.patch.object(ImageFile.ImageFile, 'load') as load:
+            response = self.upload(make_jpeg((100, 100)))
+        load.assert_not_called()
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка слишком большая: 100×100 точек.',
+        )
+        self.assertFalse(Post.objects.exists())
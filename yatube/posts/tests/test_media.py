@@ -0,0 +1,155 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from core.storage import content_storage, is_content_name
+from .. import media, thumbnails
+from ..models import ImageVariant, MediaFile, Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+# Размер исходной картинки: проверяется сборка мусора, а не ресайз sorl.
+GEOMETRIES = {'card': ('2x1', {'upscale': False})}
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_GEOMETRIES=GEOMETRIES
+)
+class ContentAddressedMediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='archivist')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, name='small.gif', content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def references(self, name):
+        return MediaFile.objects.get(name=name).references
+
+    def test_identical_uploads_share_one_sharded_file(self):
+        first = self.create_post('first.gif')
+        second = self.create_post('second.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name,
+            r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$',
+        )
+        self.assertEqual(self.references(first.image.name), 2)
+        first.delete()
+        self.assertEqual(self.references(second.image.name), 1)
+        second.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\x00', 'image/gif'
+        )
+        second.save()
+        self.assertEqual(self.references(first.image.name), 0)
+        self.assertEqual(self.references(second.image.name), 1)
+
+    def test_reference_count_decides_before_posts(self):
+        post = self.create_post()
+        name = post.image.name
+        Post.objects.filter(pk=post.pk).update(image='')
+        media.delete_unreferenced(name)
+        self.assertTrue(content_storage.exists(name))
+        MediaFile.objects.filter(name=name).update(references=0)
+        Post.objects.filter(pk=post.pk).update(image=name)
+        self.assertEqual(media.find_referenced_originals([name]), {name})
+        media.delete_unreferenced(name)
+        self.assertTrue(content_storage.exists(name))
+        Post.objects.filter(pk=post.pk).update(image='')
+        media.delete_unreferenced(name)
+        self.assertFalse(content_storage.exists(name))
+
+    def test_migrate_media_moves_flat_files(self):
+        flat = FileSystemStorage(location=TEMP_MEDIA_ROOT)
+        posts = []
+        for i in range(3):
+            name = flat.save(f'posts/flat{i}.gif', ContentFile(SMALL_GIF))
+            post = Post.objects.create(author=self.user, text=name)
+            Post.objects.filter(pk=post.pk).update(image=name)
+            posts.append((post.pk, name))
+        with mock.patch.object(transaction, 'on_commit', lambda func: func()):
+            call_command('migrate_media', batch_size=2, stdout=StringIO())
+        for pk, name in posts:
+            post = Post.objects.get(pk=pk)
+            self.assertTrue(is_content_name(post.image.name))
+            self.assertFalse(flat.exists(name))
+            self.assertTrue(content_storage.exists(post.image.name))
+        self.assertEqual(self.references(post.image.name), 3)
+        stdout = StringIO()
+        call_command('migrate_media', stdout=stdout)
+        self.assertIn('Перенесено картинок: 0', stdout.getvalue())
+
+    def test_garbage_collector_removes_unreferenced_files(self):
+        deleted = self.create_post('deleted.gif')
+        kept = self.create_post('kept.gif', SMALL_GIF + b'\x00')
+        for post in (deleted, kept):
+            thumbnails.process_post_image(post.pk)
+        garbage = [deleted.image.name] + [
+            variant.file.name for variant in deleted.image_variants.all()
+        ]
+        thumbnail = thumbnails.ready_thumbnail(deleted.image, 'card')
+        kept_thumbnail = thumbnails.ready_thumbnail(kept.image, 'card')
+        deleted.delete()
+        self.assertEqual(ImageVariant.objects.filter(
+            file__in=garbage
+        ).count(), 0)
+
+        fresh = media.collect_garbage(grace=3600, dry_run=True)
+        self.assertEqual(sum(
+            counts['files'] for counts in fresh.values()
+        ), 0)
+
+        found = []
+        report = media.collect_garbage(
+            grace=0, dry_run=True, found=lambda *args: found.append(args)
+        )
+        self.assertEqual(report[media.ORIGINALS]['files'], 1)
+        self.assertEqual(report[media.VARIANTS]['files'], 2)
+        self.assertEqual(report[media.THUMBNAILS]['files'], 1)
+        self.assertEqual(
+            {name for _, name, _ in found}, {*garbage, thumbnail.name}
+        )
+        self.assertTrue(content_storage.exists(deleted.image.name))
+
+        media.collect_garbage(grace=0, batch_size=2, pause=0)
+        for name in garbage:
+            self.assertFalse(content_storage.exists(name))
+        self.assertFalse(thumbnail.exists())
+        self.assertTrue(content_storage.exists(kept.image.name))
+        self.assertTrue(kept_thumbnail.exists())
+        self.assertEqual(kept.image_variants.count(), 2)
+        self.assertFalse(
+            MediaFile.objects.filter(name=deleted.image.name).exists()
+        )
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from ..models import Post, User
+from ..paginators import ELLIPSIS, EstimatedPaginator
+
+
+USERNAME = 'leo'
+
+
+class EstimatedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}') for i in range(30)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_elided_page_range_is_bounded(self):
+        paginator = EstimatedPaginator(range(50000), 10)
+        page_range = list(paginator.get_page(50).elided_page_range)
+        self.assertEqual(
+            page_range,
+            [1, ELLIPSIS, 47, 48, 49, 50, 51, 52, 53, ELLIPSIS, 100],
+        )
+
+    @override_settings(PAGINATOR_MAX_PAGES=3)
+    def test_page_depth_is_capped(self):
+        paginator = EstimatedPaginator(Post.objects.all(), 5)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual(paginator.get_page(6).number, 3)
+
+    def test_page_beyond_last_falls_back_to_last(self):
+        paginator = EstimatedPaginator(Post.objects.all(), 10)
+        page = paginator.get_page(50)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 10)
+        self.assertEqual(page.elided_page_range, [1, 2, 3])
+
+    def test_overestimated_count_falls_back_to_first_page(self):
+        paginator = EstimatedPaginator(Post.objects.all(), 10)
+        paginator.count = 500
+        page = paginator.get_page(50)
+        self.assertEqual(page.number, 1)
+        self.assertEqual(len(page), 10)
+
+    def test_count_is_cached(self):
+        EstimatedPaginator(Post.objects.all(), 10).count
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                EstimatedPaginator(Post.objects.all(), 10).count, 30
+            )
@@ -0,0 +1,92 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, SearchTerm, User
+from ..search import RankedPaginator, tokenize
+
+
+SEARCH_URL = reverse('posts:search')
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='searcher')
+        cls.cats = Post.objects.create(
+            author=cls.user, text='Коты, коты и ещё раз коты'
+        )
+        cls.cat = Post.objects.create(
+            author=cls.user, text='Про кота и собаку'
+        )
+        cls.dog = Post.objects.create(author=cls.user, text='Только собака')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        response = self.client.get(SEARCH_URL, {'q': query, **params})
+        return response, list(response.context['page_obj'])
+
+    def test_tokenize_stems_russian_words(self):
+        self.assertEqual(tokenize('Котов, коты и Кот!'), {'кот': 3})
+
+    def test_results_are_ranked(self):
+        _, posts = self.search('котов')
+        self.assertEqual(posts, [self.cats, self.cat])
+
+    def test_all_words_must_match(self):
+        _, posts = self.search('кот собака')
+        self.assertEqual(posts, [self.cat])
+
+    def test_index_follows_edits_and_deletes(self):
+        dog = Post.objects.get(pk=self.dog.pk)
+        dog.text = 'Собака и кот'
+        dog.save()
+        _, posts = self.search('кот собака')
+        self.assertEqual(set(posts), {self.cat, self.dog})
+        Post.objects.filter(pk=self.cat.pk).delete()
+        _, posts = self.search('кот собака')
+        self.assertEqual(posts, [self.dog])
+
+    def test_keyset_pages_do_not_overlap(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text='кот ' * (i % 3 + 1))
+            for i in range(15)
+        )
+        call_command('rebuild_search_index', batch_size=4, stdout=StringIO())
+        response, first = self.search('кот')
+        self.assertEqual(len(first), 10)
+        _, second = self.search(
+            'кот', after=response.context['page_obj'].next_cursor
+        )
+        self.assertEqual(len(second), 7)
+        self.assertFalse({post.pk for post in first} & {
+            post.pk for post in second
+        })
+        ranks = [post.rank for post in first + second]
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+        rank, pk = RankedPaginator.decode_cursor(
+            response.context['page_obj'].next_cursor
+        )
+        self.assertEqual((rank, pk), (first[-1].rank, first[-1].pk))
+        self.assertIsInstance(rank, int)
+
+    def test_admin_search_uses_index(self):
+        admin = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/')
+        with CaptureQueriesContext(connection) as context:
+            queryset, duplicates = admin.get_search_results(
+                request, Post.objects.all(), 'собаки'
+            )
+            posts = set(queryset)
+        self.assertEqual(posts, {self.cat, self.dog})
+        self.assertFalse(duplicates)
+        self.assertNotIn('LIKE', context.captured_queries[0]['sql'])
+        self.assertTrue(SearchTerm.objects.filter(term='собак').exists())
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Post, PostTag, TagCount, User
+from ..tags import extract_tags, top_tags
+
+
+def tag_url(name):
+    return reverse('posts:tag', args=[name])
+
+
+class TagTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tagger')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_extract_tags(self):
+        self.assertEqual(
+            extract_tags('#Котики и #котики, почта a#b, ##два, #Ёж'),
+            {'котики', 'еж'},
+        )
+
+    def test_tag_feed_uses_cursor_pagination(self):
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f'Пост {i} #кот')
+        Post.objects.create(author=self.user, text='Без тегов')
+        response = self.client.get(tag_url('Кот'))
+        first = list(response.context['page_obj'])
+        self.assertEqual(len(first), 10)
+        response = self.client.get(tag_url('кот'), {
+            'after': response.context['page_obj'].next_cursor,
+        })
+        second = list(response.context['page_obj'])
+        self.assertEqual(len(second), 2)
+        self.assertEqual(
+            {post.text for post in first + second},
+            {f'Пост {i} #кот' for i in range(12)},
+        )
+
+    def test_numbered_page_reads_only_its_entries(self):
+        posts = [
+            Post.objects.create(author=self.user, text=f'Пост {i} #кот')
+            for i in range(12)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(tag_url('кот'), {'page': 2})
+        self.assertEqual(list(response.context['page_obj']), posts[1::-1])
+        self.assertTrue(any(
+            'OFFSET 10' in query['sql'] for query in context.captured_queries
+        ))
+
+    def test_unknown_tag_is_not_found(self):
+        self.assertEqual(self.client.get(tag_url('нет')).status_code, 404)
+
+    def test_index_and_top_tags_follow_edits(self):
+        post = Post.objects.create(author=self.user, text='#кот и #пес')
+        Post.objects.create(author=self.user, text='#кот')
+        self.assertEqual(top_tags(), [('кот', 2), ('пес', 1)])
+        post.text = '#пес и #еж'
+        post.save()
+        cache.clear()
+        self.assertEqual(top_tags(), [('еж', 1), ('кот', 1), ('пес', 1)])
+        self.assertEqual(
+            set(post.tag_entries.values_list('tag__name', flat=True)),
+            {'пес', 'еж'},
+        )
+        post.delete()
+        cache.clear()
+        self.assertEqual(top_tags(), [('кот', 1)])
+
+    def test_deleting_deferred_post_forgets_tags(self):
+        Post.objects.create(author=self.user, text='Мурзик #кот')
+        self.client.get(tag_url('кот'))
+        Post.objects.defer('text').get().delete()
+        self.assertEqual(TagCount.objects.get().count, 0)
+        self.assertNotContains(self.client.get(tag_url('кот')), 'Мурзик')
+
+    def test_old_posts_are_not_counted(self):
+        post = Post.objects.create(author=self.user, text='#старое')
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=2)
+        )
+        call_command('index_tags', batch_size=1, stdout=StringIO())
+        self.assertEqual(top_tags(), [])
+        self.assertTrue(PostTag.objects.filter(post=post).exists())
+
+    def test_index_tags_backfills(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'#пачка {i}') for i in range(3)
+        )
+        self.assertFalse(PostTag.objects.exists())
+        call_command('index_tags', batch_size=2, stdout=StringIO())
+        self.assertEqual(PostTag.objects.count(), 3)
+        self.assertEqual(TagCount.objects.get().count, 3)
+        self.assertEqual(top_tags(), [('пачка', 3)])
@@ -0,0 +1,146 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import cards, selectors, thumbnails
+from ..models import ImageVariant, Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+PLACEHOLDER = 'aspect-ratio'
+# Размер исходной картинки: проверяется конвейер, а не ресайз sorl.
+GEOMETRIES = {'card': ('2x1', {'upscale': False})}
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_GEOMETRIES=GEOMETRIES
+)
+class ThumbnailPipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='photographer')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='thumbnails_small.gif',
+                content=SMALL_GIF,
+                content_type='image/gif',
+            ),
+        )
+        cls.url = reverse('posts:post_detail', args=[cls.post.pk])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_request_never_resizes(self):
+        with mock.patch(
+            'sorl.thumbnail.base.ThumbnailBackend._create_thumbnail'
+        ) as create_thumbnail:
+            response = self.client.get(self.url)
+        create_thumbnail.assert_not_called()
+        self.assertContains(response, PLACEHOLDER)
+
+    def test_generated_images_replace_placeholder(self):
+        self.client.get(self.url)
+        self.assertTrue(thumbnails.process_post_image(self.post.pk))
+        self.assertFalse(thumbnails.process_post_image(self.post.pk))
+        self.assertIsNotNone(
+            thumbnails.ready_thumbnail(self.post.image, 'card')
+        )
+        response = self.client.get(self.url)
+        self.assertNotContains(response, PLACEHOLDER)
+        self.assertContains(response, '<source type="image/webp"')
+        for variant in self.post.image_variants.all():
+            self.assertContains(
+                response, f'{variant.file.url} {variant.width}w'
+            )
+
+    def test_variants_are_recorded_with_hashed_names(self):
+        thumbnails.process_post_image(self.post.pk)
+        variants = ImageVariant.objects.filter(post=self.post)
+        self.assertEqual(
+            sorted(variants.values_list('format', flat=True)),
+            [ImageVariant.JPEG, ImageVariant.WEBP],
+        )
+        for variant in variants:
+            self.assertEqual(variant.size, variant.file.size)
+            self.assertRegex(
+                variant.file.name,
+                rf'^posts/variants/(?P<shard>[0-9a-f]{{2}})/[0-9a-f]{{2}}/'
+                rf'{self.post.pk}-2w-(?P=shard)[0-9a-f]{{14}}\.'
+                rf'{variant.format}$',
+            )
+
+    def test_image_meta_is_captured(self):
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (2, 1)
+        )
+        self.assertEqual(self.post.image_lqip, '')
+        thumbnails.process_post_image(self.post.pk)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+        self.assertTrue(post.image_lqip.startswith('data:image/webp;base64,'))
+        self.assertLess(len(post.image_lqip), 1000)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'width="2" height="1"')
+        self.assertContains(response, post.image_lqip)
+
+    def test_page_thumbnails_are_fetched_in_one_lookup(self):
+        for i in range(3):
+            post = Post.objects.create(
+                author=self.user,
+                text=f'Ещё пост {i}',
+                image=SimpleUploadedFile(
+                    name=f'thumbnails_batch_{i}.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif',
+                ),
+            )
+            thumbnails.generate_thumbnails(post)
+        ImageVariant.objects.all().delete()
+        cache.clear()
+        thumbnails.default.kvstore.cache.clear()
+        with mock.patch.object(
+            thumbnails.default.kvstore.cache, 'get_many',
+            wraps=thumbnails.default.kvstore.cache.get_many,
+        ) as get_many, CaptureQueriesContext(connection) as context:
+            posts = cards.attach_cards(
+                selectors.feed_posts().exclude(pk=self.post.pk)
+            )
+        # Кеш KV sorl общий с карточками: считаются только его ключи.
+        self.assertEqual(len([
+            call for call in get_many.call_args_list
+            if all(key.startswith('sorl-thumbnail||') for key in call[0][0])
+        ]), 1)
+        self.assertEqual(len([
+            query for query in context.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]), 1)
+        for post in posts:
+            self.assertIsNotNone(post.prefetched_thumbnails['card'])
+            self.assertNotIn(PLACEHOLDER, post.card.body)
@@ -0,0 +1,117 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User
+
+
+USERNAME = 'leo'
+CELEBRITY_USERNAME = 'star'
+READER_USERNAME = 'reader'
+POST_TEXT = 'Тестовый Текст'
+FOLLOW_INDEX_URL = reverse('posts:follow_index')
+FOLLOW_URL = reverse('posts:profile_follow', args=[USERNAME])
+UNFOLLOW_URL = reverse('posts:profile_unfollow', args=[USERNAME])
+POSTS_PER_PAGE = 10
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.celebrity = User.objects.create_user(username=CELEBRITY_USERNAME)
+        cls.reader = User.objects.create_user(username=READER_USERNAME)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self, **params):
+        return self.client.get(FOLLOW_INDEX_URL, params).context['page_obj']
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        old_post = Post.objects.create(author=self.user, text=POST_TEXT)
+        self.client.get(FOLLOW_URL)
+        new_post = Post.objects.create(author=self.user, text=POST_TEXT)
+        self.assertEqual(list(self.feed()), [new_post, old_post])
+        self.client.get(UNFOLLOW_URL)
+        self.assertFalse(TimelineEntry.objects.filter(follower=self.reader))
+        self.assertEqual(list(self.feed()), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_posts_are_merged_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.celebrity)
+        Follow.objects.create(user=self.reader, author=self.user)
+        posts = [
+            Post.objects.create(author=author, text=POST_TEXT)
+            for author in [self.user, self.celebrity] * POSTS_PER_PAGE
+        ]
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=self.celebrity)
+        )
+        first_page = self.feed()
+        second_page = self.feed(after=first_page.next_cursor)
+        self.assertEqual(
+            list(first_page) + list(second_page), posts[::-1]
+        )
+
+    def test_rebuild_command_restores_timelines(self):
+        Follow.objects.create(user=self.reader, author=self.user)
+        Post.objects.bulk_create(
+            Post(author=self.user, text=POST_TEXT) for _ in range(3)
+        )
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(len(self.feed()), 3)
+
+    def test_numbered_page_reads_only_its_entries(self):
+        Follow.objects.create(user=self.reader, author=self.user)
+        posts = [
+            Post.objects.create(author=self.user, text=POST_TEXT)
+            for _ in range(POSTS_PER_PAGE + 5)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            page = self.feed(page=2)
+        self.assertEqual(list(page), posts[4::-1])
+        self.assertTrue(any(
+            f'OFFSET {POSTS_PER_PAGE}' in query['sql']
+            for query in context.captured_queries
+        ))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_feed_pages_by_cursor(self):
+        Follow.objects.create(user=self.reader, author=self.celebrity)
+        response = self.client.get(FOLLOW_INDEX_URL, {'page': 2})
+        self.assertRedirects(response, FOLLOW_INDEX_URL)
+        self.assertTrue(self.feed().is_cursor)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_posts_fanned_out_before_fame_are_read_once(self):
+        Follow.objects.create(user=self.reader, author=self.user)
+        posts = [
+            Post.objects.create(author=self.user, text=POST_TEXT)
+            for _ in range(POSTS_PER_PAGE)
+        ]
+        Follow.objects.create(user=self.celebrity, author=self.user)
+        posts.append(Post.objects.create(author=self.user, text=POST_TEXT))
+        first_page = self.feed()
+        self.assertEqual(len(first_page), POSTS_PER_PAGE)
+        self.assertTrue(first_page.has_next())
+        second_page = self.feed(after=first_page.next_cursor)
+        self.assertEqual(
+            list(first_page) + list(second_page), posts[::-1]
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_former_celebrity_posts_are_fanned_out(self):
+        Follow.objects.create(user=self.reader, author=self.user)
+        Follow.objects.create(user=self.celebrity, author=self.user)
+        post = Post.objects.create(author=self.user, text=POST_TEXT)
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        Follow.objects.filter(user=self.celebrity).delete()
+        self.assertEqual(list(self.feed()), [post])
@@ -2,6 +2,7 @@ import shutil
 import tempfile
 
 from django.conf import settings
+from django.core.cache import cache
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 
@@ -65,6 +66,9 @@ class PostURLTests(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        cache.clear()
+
     def test_urls_exist_at_desired_location(self):
         client_urls = [
             [HOMEPAGE_URL, self.guest, 200],
@@ -4,9 +4,12 @@ import tempfile
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection, transaction
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from .. import timelines
 from ..models import Group, Post, Follow, User
 from yatube.settings import POSTS, PROFILE_POSTS
 
@@ -125,13 +128,49 @@ class PostPagesTests(TestCase):
 
     def test_homepage_cache(self):
         response_1 = self.guest.get(HOMEPAGE_URL)
-        Post.objects.all().delete()
+        # update() не шлёт сигналов, страница остаётся в кеше.
+        Post.objects.update(
+            text='Изменённый текст', excerpt='Изменённый текст'
+        )
         response_2 = self.guest.get(HOMEPAGE_URL)
         self.assertEqual(response_1.content, response_2.content)
         cache.clear()
         response_3 = self.guest.get(HOMEPAGE_URL)
         self.assertNotEqual(response_1.content, response_3.content)
 
+    def test_feed_cache_invalidated_on_write(self):
+        for url in (HOMEPAGE_URL, GROUP_URL, PROFILE_URL):
+            with self.subTest(url=url):
+                self.guest.get(url)
+                post = Post.objects.create(
+                    author=self.user, text='Свежий пост', group=self.group,
+                )
+                self.assertContains(self.guest.get(url), 'Свежий пост')
+                post.delete()
+                self.assertNotContains(self.guest.get(url), 'Свежий пост')
+
+    def test_feed_cache_varies_by_page(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Пост {i}') for i in range(POSTS)
+        )
+        first = self.guest.get(HOMEPAGE_URL)
+        second = self.guest.get(HOMEPAGE_URL, {'page': 2})
+        self.assertNotEqual(first.content, second.content)
+        self.assertEqual(len(second.context['page_obj']), 1)
+
+    def test_group_post_keeps_other_group_cache(self):
+        response_1 = self.another.get(GROUP2_URL)
+        with CaptureQueriesContext(connection) as context:
+            self.another.get(GROUP2_URL)
+        cached_queries = len(context)
+        Post.objects.create(
+            author=self.user, text='В группе', group=self.group
+        )
+        with CaptureQueriesContext(connection) as context:
+            response_2 = self.another.get(GROUP2_URL)
+        self.assertEqual(len(context), cached_queries)
+        self.assertEqual(response_1.content, response_2.content)
+
     def test_follow_author(self):
         follow_count = Follow.objects.all().count()
         self.another.get(FOLLOW_URL)
@@ -165,6 +204,30 @@ class PostPagesTests(TestCase):
             author=self.user,
         ).exists())
 
+    def test_follow_state_in_context(self):
+        self.assertFalse(self.another.get(PROFILE_URL).context['following'])
+        self.assertEqual(
+            self.another.get(HOMEPAGE_URL).context['followed_authors'], set()
+        )
+        Follow.objects.create(
+            user=self.user_not_author,
+            author=self.user,
+        )
+        for url in [HOMEPAGE_URL, GROUP_URL]:
+            with self.subTest(url=url):
+                response = self.another.get(url)
+                self.assertEqual(
+                    response.context['followed_authors'], {self.user.id}
+                )
+        self.assertTrue(self.another.get(PROFILE_URL).context['following'])
+
+    def test_follow_is_unique(self):
+        Follow.objects.create(user=self.user_not_author, author=self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(
+                user=self.user_not_author, author=self.user
+            )
+
     def test_self_follow(self):
         self.author.get(FOLLOW_URL)
         self.assertFalse(Follow.objects.filter(
@@ -184,6 +247,9 @@ class PaginatorViewsTest(TestCase):
             slug=GROUP_SLUG,
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_paginator_shows_correct_records(self):
         posts = [Post(author=self.user,
                       text=f'Тестовый текст {i} поста',
@@ -205,3 +271,67 @@ class PaginatorViewsTest(TestCase):
         Post.objects.bulk_create(posts)
         response = self.client.get(PROFILE_URL)
         self.assertEqual(len(response.context['page_obj']), PROFILE_POSTS)
+
+    def test_cursor_pages_do_not_overlap(self):
+        posts = [Post(author=self.user,
+                      text=f'Тестовый текст {i} поста',
+                      group=self.group) for i in range(0, POSTS + 3)]
+        Post.objects.bulk_create(posts)
+        first_page = self.client.get(HOMEPAGE_URL).context['page_obj']
+        second_page = self.client.get(
+            HOMEPAGE_URL, {'after': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(set(first_page) & set(second_page))
+        back_page = self.client.get(
+            HOMEPAGE_URL, {'before': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+
+    def test_broken_cursor_shows_first_page(self):
+        Post.objects.create(author=self.user, text=POST_TEXT)
+        response = self.client.get(HOMEPAGE_URL, {'after': 'broken'})
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            description=GROUP_DESCRIPTION,
+            slug=GROUP_SLUG,
+        )
+        cls.follower = User.objects.create_user(username=NOT_AUTHOR_USERNAME)
+        Follow.objects.create(user=cls.follower, author=cls.user)
+        cls.reader = Client()
+        cls.reader.force_login(cls.follower)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.reader.get(url)
+        return len(queries)
+
+    def create_posts(self, count):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=POST_TEXT, group=self.group)
+            for _ in range(count)
+        )
+        # bulk_create не шлёт сигналов: ленту подписок раскладываем сами.
+        timelines.rebuild_timeline(self.follower.pk)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        urls = [HOMEPAGE_URL, GROUP_URL, PROFILE_URL, FOLLOW_INDEX_URL]
+        self.create_posts(2)
+        small = {url: self.count_queries(url) for url in urls}
+        self.create_posts(PROFILE_POSTS - 2)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), small[url])
+        self.assertEqual(len(
+            self.reader.get(FOLLOW_INDEX_URL).context['page_obj']
+        ), PROFILE_POSTS)
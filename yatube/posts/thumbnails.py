@@ -0,0 +1,258 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend as SorlThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.workers import setup_django
+from . import feed_cache, image_meta, tags, variants
+from .models import Post
+
+
+logger = logging.getLogger(__name__)
+
+
+class ThumbnailBackend(SorlThumbnailBackend):
+    """Backend sorl, умеющий искать миниатюру без её генерации."""
+
+    def prepare(self, file_, geometry_string, options):
+        # Повторяет подготовку опций из get_thumbnail(), чтобы имя
+        # миниатюры совпадало с тем, что создаёт sorl.
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return ImageFile(
+            self._get_thumbnail_filename(source, geometry_string, options),
+            default.storage,
+        )
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            return None
+        return default.kvstore.get(
+            self.prepare(file_, geometry_string, options)
+        )
+
+
+backend = ThumbnailBackend()
+
+
+def get_geometry(name):
+    geometry, options = settings.THUMBNAIL_GEOMETRIES[name]
+    return geometry, dict(options)
+
+
+def ready_thumbnail(image, name):
+    """Готовая миниатюра или None; в запросе картинки не ресайзятся."""
+    geometry, options = get_geometry(name)
+    return backend.get_ready_thumbnail(image, geometry, **options)
+
+
+def get_many_raw(keys):
+    """Значения KV-хранилища sorl: один get_many к кешу и один запрос
+    к БД на промахи, которые затем кладутся в кеш."""
+    kvstore = default.kvstore
+    values = kvstore.cache.get_many(keys)
+    missed = [key for key in keys if key not in values]
+    if missed:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missed
+        ).values_list('key', 'value'))
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missed}
+        kvstore.cache.set_many(
+            fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(fetched)
+    return values
+
+
+def registered_thumbnails(names):
+    """Имена из names, которые KV-хранилище sorl знает как миниатюры."""
+    files = {name: ImageFile(name, default.storage) for name in names}
+    if not isinstance(default.kvstore, CachedDBKVStore):
+        return {
+            name for name, file in files.items() if default.kvstore.get(file)
+        }
+    keys = {add_prefix(file.key): name for name, file in files.items()}
+    values = get_many_raw(list(keys)) if keys else {}
+    return {
+        name for key, name in keys.items()
+        if values.get(key) not in (None, EMPTY_VALUE)
+    }
+
+
+def release_thumbnails(name, storage, dry_run=False):
+    """Имена миниатюр исходной картинки по KV-хранилищу sorl.
+
+    Без dry_run записи о картинке и её миниатюрах удаляются из
+    хранилища, а сами файлы остаются сборщику мусора.
+    """
+    kvstore = default.kvstore
+    source = ImageFile(name, storage)
+    names = set()
+    for key in kvstore._get(source.key, identity='thumbnails') or ():
+        thumbnail = kvstore._get(key)
+        if thumbnail:
+            names.add(thumbnail.name)
+        if not dry_run:
+            kvstore._delete(key)
+    if not dry_run:
+        kvstore._delete(source.key, identity='thumbnails')
+        kvstore._delete(source.key)
+    return names
+
+
+def prefetch_thumbnails(posts):
+    """Проставляет постам post.prefetched_thumbnails за один проход.
+
+    Для кеширующего KV-хранилища все миниатюры страницы читаются одним
+    обращением к кешу; иначе каждая ищется отдельно.
+    """
+    posts = [post for post in posts if post.image]
+    wanted = {}
+    for post in posts:
+        for name in settings.THUMBNAIL_GEOMETRIES:
+            geometry, options = get_geometry(name)
+            thumbnail = backend.prepare(post.image, geometry, options)
+            wanted[post.pk, name] = add_prefix(thumbnail.key)
+    if not isinstance(default.kvstore, CachedDBKVStore):
+        for post in posts:
+            post.prefetched_thumbnails = {
+                name: ready_thumbnail(post.image, name)
+                for name in settings.THUMBNAIL_GEOMETRIES
+            }
+        return posts
+    values = get_many_raw(list(wanted.values())) if wanted else {}
+    for post in posts:
+        post.prefetched_thumbnails = {}
+        for name in settings.THUMBNAIL_GEOMETRIES:
+            value = values.get(wanted[post.pk, name])
+            post.prefetched_thumbnails[name] = (
+                deserialize_image_file(value)
+                if value and value != EMPTY_VALUE else None
+            )
+    return posts
+
+
+def generate_thumbnails(post):
+    """Создаёт недостающие миниатюры THUMBNAIL_GEOMETRIES поста."""
+    missing = [
+        name for name in settings.THUMBNAIL_GEOMETRIES
+        if ready_thumbnail(post.image, name) is None
+    ]
+    for name in missing:
+        geometry, options = get_geometry(name)
+        get_thumbnail(post.image, geometry, **options)
+    return bool(missing)
+
+
+def process_post_image(post_id):
+    """Задача пула: заглушка, миниатюры и варианты картинки поста.
+
+    Если что-то было создано, сдвигает updated_at поста и поколения
+    лент, чтобы карточки с заглушкой перерисовались.
+    """
+    post = Post.objects.filter(pk=post_id).only(
+        'id', 'image', 'image_lqip', 'author', 'group'
+    ).first()
+    if post is None:
+        return False
+    fields = {}
+    if post.image and not post.image_lqip:
+        fields = image_meta.capture(post.image)
+    changed = variants.generate_variants(post_id)
+    if post.image:
+        changed = generate_thumbnails(post) or changed
+    if not (changed or fields):
+        return False
+    Post.objects.filter(pk=post_id).update(
+        updated_at=timezone.now(), **fields
+    )
+    feed_cache.bump_generations(
+        *feed_cache.feed_names(post), *tags.post_tag_feed_names(post)
+    )
+    return True
+
+
+def create_executor(workers=None):
+    # spawn вместо fork: дочерний процесс не наследует соединения с БД
+    # и кешем веб-воркера.
+    return ProcessPoolExecutor(
+        max_workers=workers or settings.THUMBNAIL_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=setup_django,
+    )
+
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = create_executor()
+    return _executor
+
+
+def log_failure(future):
+    if future.exception() is not None:
+        logger.error(
+            'Thumbnail generation failed', exc_info=future.exception()
+        )
+
+
+def submit(post_id):
+    global _executor
+    if not settings.THUMBNAIL_ASYNC:
+        process_post_image(post_id)
+        return
+    try:
+        future = get_executor().submit(process_post_image, post_id)
+    except BrokenProcessPool:
+        # Пул пересоздаётся при следующей загрузке, а пропущенные
+        # миниатюры догенерирует warm_thumbnails.
+        logger.exception('Thumbnail pool is broken, post %s skipped', post_id)
+        _executor = None
+        return
+    future.add_done_callback(log_failure)
+
+
+def schedule_thumbnails(post):
+    """Ставит обработку картинки в пул процессов после коммита."""
+    transaction.on_commit(lambda: submit(post.pk))
+
+
+def warm_thumbnails(workers=None, batch_size=1000):
+    """Создаёт недостающие миниатюры и варианты в пуле процессов."""
+    posts = Post.objects.exclude(image='').order_by('pk')
+    generated = 0
+    last_pk = 0
+    with create_executor(workers) as executor:
+        while True:
+            post_ids = list(posts.filter(pk__gt=last_pk).values_list(
+                'pk', flat=True
+            )[:batch_size])
+            if not post_ids:
+                return generated
+            generated += sum(executor.map(process_post_image, post_ids))
+            last_pk = post_ids[-1]
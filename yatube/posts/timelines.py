@@ -0,0 +1,193 @@
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from . import selectors
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginators import estimate_count, keyset_filter
+
+
+def is_celebrity(author_id):
+    """Посты авторов с огромным числом подписчиков не раскладываются."""
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__gte=settings.TIMELINE_FANOUT_LIMIT,
+    ).exists()
+
+
+def insert_entries(follower_ids, posts):
+    entries = [
+        TimelineEntry(follower_id=follower_id, post_id=pk, pub_date=pub_date)
+        for follower_id in follower_ids for pk, pub_date in posts
+    ]
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    if post.author_id is None or is_celebrity(post.author_id):
+        return
+    insert_entries(
+        Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True),
+        [(post.pk, post.pub_date)],
+    )
+
+
+def recent_posts(author_id):
+    return Post.objects.filter(
+        author_id=author_id
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL]
+
+
+def backfill(follower_id, author_id):
+    if is_celebrity(author_id):
+        return
+    insert_entries([follower_id], recent_posts(author_id))
+
+
+def restore_fan_out(author_id, removed=1):
+    """Раскладывает недавние посты автора, опустившегося ниже порога.
+
+    Пока автор был популярным, его посты в ленты не попадали, а
+    подмешивать их при чтении перестают, как только подписчиков
+    становится меньше TIMELINE_FANOUT_LIMIT.
+    """
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    if not AuthorStats.objects.filter(
+        user_id=author_id,
+        followers_count__lt=limit,
+        followers_count__gte=limit - removed,
+    ).exists():
+        return
+    posts = list(recent_posts(author_id))
+    followers = Follow.objects.filter(author_id=author_id).order_by(
+        'user_id'
+    ).values_list('user_id', flat=True)
+    last_id = 0
+    while True:
+        follower_ids = list(followers.filter(
+            user_id__gt=last_id
+        )[:settings.TIMELINE_BATCH_SIZE])
+        if not follower_ids:
+            return
+        insert_entries(follower_ids, posts)
+        last_id = follower_ids[-1]
+
+
+def trim(follower_id, author_id):
+    TimelineEntry.objects.filter(
+        follower_id=follower_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild_timeline(follower_id):
+    posts = Post.objects.filter(
+        author__following__user_id=follower_id
+    ).exclude(
+        author__stats__followers_count__gte=settings.TIMELINE_FANOUT_LIMIT
+    ).values_list('id', 'pub_date').iterator()
+    with transaction.atomic():
+        TimelineEntry.objects.filter(follower_id=follower_id).delete()
+        while True:
+            batch = list(islice(posts, settings.TIMELINE_BATCH_SIZE))
+            if not batch:
+                return
+            insert_entries([follower_id], batch)
+
+
+def rebuild_timelines(batch_size=1000):
+    """Пересобирает ленты всех подписчиков, идя по ним пачками."""
+    rebuilt = 0
+    last_id = 0
+    while True:
+        follower_ids = list(Follow.objects.filter(
+            user_id__gt=last_id
+        ).order_by('user_id').values_list(
+            'user_id', flat=True
+        ).distinct()[:batch_size])
+        if not follower_ids:
+            return rebuilt
+        for follower_id in follower_ids:
+            rebuild_timeline(follower_id)
+        rebuilt += len(follower_ids)
+        last_id = follower_ids[-1]
+
+
+class Timeline:
+    """Лента подписок пользователя.
+
+    Посты обычных авторов читаются из материализованной ленты одним
+    проходом по индексу (follower, pub_date, post), посты популярных
+    авторов подмешиваются при чтении. Пока подмешивать некого, страница
+    по номеру читается через OFFSET по тому же индексу; смешанную ленту
+    можно листать только курсором.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def celebrity_ids(self):
+        return list(Follow.objects.filter(
+            user=self.user,
+            author__stats__followers_count__gte=(
+                settings.TIMELINE_FANOUT_LIMIT
+            ),
+        ).values_list('author_id', flat=True))
+
+    def entries(self):
+        return TimelineEntry.objects.filter(follower=self.user)
+
+    @property
+    def cursor_only(self):
+        return bool(self.celebrity_ids)
+
+    def celebrity_posts(self):
+        # Посты, разложенные до того, как автор стал популярным, уже
+        # есть в ленте: потоки не пересекаются, и слияние не теряет строк.
+        return selectors.feed_posts().filter(
+            author_id__in=self.celebrity_ids
+        ).exclude(timeline_entries__follower=self.user)
+
+    def load_posts(self, post_ids):
+        posts = selectors.feed_posts().in_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
+
+    def keyset(self, key, newer, limit):
+        streams = [self.load_posts(list(keyset_filter(
+            self.entries(), key, newer, id_field='post_id'
+        ).values_list('post_id', flat=True)[:limit]))]
+        if self.celebrity_ids:
+            streams.append(list(
+                keyset_filter(self.celebrity_posts(), key, newer)[:limit]
+            ))
+        return list(islice(merge(
+            *streams,
+            key=lambda post: (post.pub_date, post.pk),
+            reverse=not newer,
+        ), limit))
+
+    def __len__(self):
+        count = estimate_count(self.entries())
+        if self.celebrity_ids:
+            count += estimate_count(self.celebrity_posts())
+        return count
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if self.cursor_only:
+            return self.keyset(None, False, key.stop)[key]
+        return self.load_posts(list(self.entries().order_by(
+            '-pub_date', '-post_id'
+        ).values_list('post_id', flat=True)[key]))
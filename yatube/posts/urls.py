@@ -9,6 +9,7 @@ urlpatterns = [
     path('group/<slug:slug>/',
          views.group_posts,
          name='groups'),
+    path('tag/<str:name>/', views.tag_posts, name='tag'),
     path('profile/<str:username>/',
          views.profile,
          name='profile'),
@@ -24,6 +25,8 @@ urlpatterns = [
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
+    path('search/', views.search, name='search'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
     path('follow/', views.follow_index, name='follow_index'),
     path('profile/<str:username>/follow/',
          views.profile_follow,
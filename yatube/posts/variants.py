@@ -0,0 +1,101 @@
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .image_meta import open_source
+from .models import ImageVariant, Post
+
+
+VARIANTS_DIR = 'posts/variants/'
+SAVE_OPTIONS = {
+    ImageVariant.WEBP: {'format': 'WEBP', 'method': 6},
+    ImageVariant.JPEG: {'format': 'JPEG', 'optimize': True,
+                        'progressive': True},
+}
+
+
+def variant_widths(source_width):
+    """Ширины вариантов не больше исходной; узкая картинка даёт один."""
+    widths = [
+        width for width in settings.IMAGE_VARIANT_WIDTHS
+        if width <= source_width
+    ]
+    return widths or [source_width]
+
+
+def encode(image, image_format):
+    buffer = BytesIO()
+    image.save(
+        buffer,
+        quality=settings.IMAGE_VARIANT_QUALITY,
+        **SAVE_OPTIONS[image_format],
+    )
+    return buffer.getvalue()
+
+
+def save_variant(post, image, image_format, width, height):
+    content = encode(image, image_format)
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    # Хеш содержимого в имени: файл неизменен и кешируется навсегда.
+    # Каталоги-шарды по хешу, как у content_storage, чтобы в одном
+    # каталоге не копились файлы всех постов.
+    name = (
+        f'{VARIANTS_DIR}{digest[:2]}/{digest[2:4]}/'
+        f'{post.pk}-{width}w-{digest}.{image_format}'
+    )
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(content))
+    return ImageVariant(
+        post=post,
+        source=post.image.name,
+        format=image_format,
+        width=width,
+        height=height,
+        file=name,
+        size=len(content),
+    )
+
+
+def generate_variants(post_id):
+    """Создаёт WebP и JPEG варианты картинки поста нужных ширин.
+
+    Кадрирование совпадает с карточкой (IMAGE_VARIANT_RATIO). Варианты
+    прежней картинки удаляются из базы, файлы убирает сборщик мусора.
+    """
+    post = Post.objects.filter(pk=post_id).only('id', 'image').first()
+    if post is None:
+        return False
+    stale = ImageVariant.objects.filter(post_id=post_id).exclude(
+        source=post.image.name
+    )
+    if not post.image:
+        return bool(stale.delete()[0])
+    if ImageVariant.objects.filter(
+        post_id=post_id, source=post.image.name
+    ).exists():
+        return bool(stale.delete()[0])
+    source = open_source(post.image)
+    variants = []
+    for width in variant_widths(source.width):
+        height = max(1, round(width / settings.IMAGE_VARIANT_RATIO))
+        image = ImageOps.fit(source, (width, height), Image.LANCZOS)
+        for image_format in settings.IMAGE_VARIANT_FORMATS:
+            variants.append(
+                save_variant(post, image, image_format, width, height)
+            )
+    with transaction.atomic():
+        stale.delete()
+        ImageVariant.objects.bulk_create(variants, ignore_conflicts=True)
+    return True
+
+
+def srcset(variants, image_format):
+    return ', '.join(
+        f'{variant.file.url} {variant.width}w'
+        for variant in variants if variant.format == image_format
+    )
@@ -1,43 +1,127 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db.models import QuerySet
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
 
-from .models import Group, Post, Follow, User
+from core.page_cache import page_cache
+from core.query_budget import query_budget
+
+from .models import AutocompleteEntry, Group, Post, Follow, Tag, User
+from . import cards, feed_cache, selectors, tags, timelines
+from .autocomplete import complete
+from .counters import get_author_stats
+from .follows import followed_author_ids, is_following
 from .forms import PostForm, CommentForm
+from .paginators import (CURSOR_ORDERING, CursorPaginator,
+                         EstimatedPaginator, encode_cursor)
+from .search import RankedPaginator, SearchResults
 from yatube.settings import PROFILE_POSTS, POSTS
 
 
 def paginate(queryset, request, page_size=POSTS):
-    return Paginator(queryset, page_size).get_page(request.GET.get('page'))
+    if (getattr(queryset, 'cursor_only', False)
+            or 'after' in request.GET or 'before' in request.GET):
+        return CursorPaginator(queryset, page_size).get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    if isinstance(queryset, QuerySet):
+        queryset = queryset.order_by(*CURSOR_ORDERING)
+    page = EstimatedPaginator(queryset, page_size).get_page(
+        request.GET.get('page')
+    )
+    page.next_cursor = (
+        encode_cursor(page[-1]) if page and page.has_next() else None
+    )
+    return page
+
+
+def follow_state(request, page_obj):
+    return followed_author_ids(
+        request.user, [post.author_id for post in page_obj]
+    )
+
+
+def paginate_cards(queryset, request, page_size=POSTS, variant=cards.FEED):
+    page_obj = paginate(queryset, request, page_size)
+    cards.attach_cards(page_obj, variant)
+    return page_obj
+
+
+def feed_context(request, feed, queryset, page_size=POSTS,
+                 follow_buttons=True, variant=cards.FEED):
+    # Страница и подписки вычисляются лениво: при попадании в кеш
+    # фрагмента ленты шаблон к ним не обращается и запросов нет.
+    page_obj = SimpleLazyObject(
+        lambda: paginate_cards(queryset, request, page_size, variant)
+    )
+    context = {
+        'page_obj': page_obj,
+        'feed_fragment': feed_cache.feed_fragment(feed, request),
+    }
+    if follow_buttons:
+        context['followed_authors'] = SimpleLazyObject(
+            lambda: follow_state(request, page_obj)
+        )
+    return context
 
 
+@page_cache()
+@query_budget(5)
 def index(request):
-    return render(request, 'posts/index.html', {
-        'page_obj': paginate(Post.objects.all(), request),
-    })
+    return render(request, 'posts/index.html', feed_context(
+        request, 'index', selectors.feed_posts()
+    ))
 
 
+@page_cache()
+@query_budget(6)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     return render(request, 'posts/group_list.html', {
         'group': group,
-        'page_obj': paginate(group.posts.all(), request),
+        **feed_context(
+            request, f'group:{group.pk}', selectors.group_posts(group),
+            variant=cards.GROUP,
+        ),
     })
 
 
+@page_cache()
+@query_budget(6)
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=tags.normalize(name))
+    return render(request, 'posts/tag_list.html', {
+        'tag': tag,
+        'top_tags': SimpleLazyObject(tags.top_tags),
+        **feed_context(request, f'tag:{tag.pk}', tags.TagFeed(tag)),
+    })
+
+
+@page_cache()
+@query_budget(6)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    if request.user.is_authenticated:
-        Follow.objects.filter(user=request.user, author=author).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     return render(request, 'posts/profile.html', {
         'author': author,
-        'page_obj': paginate(author.posts.all(), request, PROFILE_POSTS),
-        'following': Follow.objects.all(),
+        'stats': get_author_stats(author),
+        'following': is_following(request.user, author),
+        **feed_context(
+            request, f'profile:{author.pk}', selectors.author_posts(author),
+            PROFILE_POSTS, follow_buttons=False,
+        ),
     })
 
 
+@page_cache()
+@query_budget(4)
 def post_detail(request, post_id, form=None):
-    post = get_object_or_404(Post, id=post_id)
+    feed_cache.track_generations(request, ['all', f'post:{post_id}'])
+    post = get_object_or_404(selectors.detail_post(), id=post_id)
+    cards.attach_cards([post], cards.DETAIL)
     return render(request, 'posts/post_detail.html', {
         'post': post,
         'form': CommentForm(request.POST or None),
@@ -45,6 +129,7 @@ def post_detail(request, post_id, form=None):
     })
 
 
+@query_budget(9)
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None,
@@ -59,6 +144,7 @@ def post_create(request):
     })
 
 
+@query_budget(7)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -76,6 +162,7 @@ def post_edit(request, post_id):
     })
 
 
+@query_budget(5)
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
@@ -88,27 +175,61 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(7)
 @login_required
 def follow_index(request):
+    timeline = timelines.Timeline(request.user)
+    # Номер страницы смешанной ленты стоил бы чтения всех предыдущих.
+    if timeline.cursor_only and request.GET.get('page', '1') != '1':
+        return redirect('posts:follow_index')
+    page_obj = paginate_cards(timeline, request)
     return render(request, 'posts/follow.html', {
-        'page_obj': paginate(Post.objects.all().filter(
-            author__following__user=request.user), request),
+        'page_obj': page_obj,
+        'followed_authors': {post.author_id for post in page_obj},
+    })
+
+
+@query_budget(5)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = RankedPaginator(SearchResults(query), POSTS).get_page(
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+        cards.attach_cards(page_obj)
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
+        'followed_authors': SimpleLazyObject(
+            lambda: follow_state(request, page_obj or [])
+        ),
     })
 
 
+@query_budget(1)
+def autocomplete(request):
+    kind = request.GET.get('kind')
+    if kind not in dict(AutocompleteEntry.KINDS):
+        kind = None
+    return JsonResponse(complete(
+        request.GET.get('q', ''), kind, request.GET.get('after')
+    ))
+
+
+@query_budget(9)
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    if author != request.user and not author.following.filter(
-        user=request.user,
-    ).exists():
-        Follow.objects.create(
-            user=request.user,
-            author=author,
-        )
+    if author != request.user:
+        # Повторный клик в параллельном запросе упрётся в unique_follow,
+        # get_or_create переживает это и просто прочитает подписку.
+        Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
+@query_budget(8)
 @login_required
 def profile_unfollow(request, username):
     get_object_or_404(request.user.follower,
@@ -0,0 +1,50 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """Выпадающий список только с выбранным вариантом.
+
+    Остальные варианты скрипт подгружает постранично с эндпоинта
+    автодополнения, поэтому отрисовка формы не читает всю таблицу.
+    """
+
+    class Media:
+        js = ('posts/js/autocomplete.js',)
+
+    def __init__(self, kind, attrs=None):
+        super().__init__(attrs)
+        self.kind = kind
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs'].update({
+            'data-autocomplete-url': reverse('posts:autocomplete'),
+            'data-autocomplete-kind': self.kind,
+        })
+        return context
+
+    def selected_choices(self, value):
+        field = self.choices.field
+        pks = [pk for pk in value if pk not in field.empty_values]
+        if not pks:
+            return []
+        try:
+            objects = list(field.queryset.filter(pk__in=pks))
+        except (ValueError, TypeError, ValidationError):
+            return []
+        return [(obj.pk, field.label_from_instance(obj)) for obj in objects]
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        choices = self.selected_choices(value)
+        if field.empty_label is not None:
+            choices.insert(0, ('', field.empty_label))
+        return [
+            (None, [self.create_option(
+                name, option_value, label, str(option_value) in value,
+                index, attrs=attrs,
+            )], index)
+            for index, (option_value, label) in enumerate(choices)
+        ]
@@ -2,6 +2,8 @@ from django.contrib.auth.views import (LoginView, LogoutView,
                                        PasswordChangeView, PasswordResetView)
 from django.urls import path
 
+from core.query_budget import query_budget
+
 from . import views
 
 app_name = 'users'
@@ -9,15 +11,19 @@ app_name = 'users'
 urlpatterns = [
     path('signup/', views.SignUp.as_view(), name='signup'),
     path('logout/',
-         LogoutView.as_view(template_name='users/logged_out.html'),
+         query_budget(3)(
+             LogoutView.as_view(template_name='users/logged_out.html')
+         ),
          name='logout'),
     path('login/',
-         LoginView.as_view(template_name='users/login.html'),
+         query_budget(2)(
+             LoginView.as_view(template_name='users/login.html')
+         ),
          name='login'),
     path('password_reset/',
-         PasswordResetView.as_view(),
+         query_budget(2)(PasswordResetView.as_view()),
          name='password_reset'),
     path('password_change/',
-         PasswordChangeView.as_view(),
+         query_budget(2)(PasswordChangeView.as_view()),
          name='password_change'),
 ]
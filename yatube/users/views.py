@@ -1,6 +1,8 @@
 from django.urls import reverse_lazy
 from django.views.generic import CreateView
 
+from core.query_budget import QueryBudget
+
 from .forms import CreationForm
 
 
@@ -8,3 +10,4 @@ class SignUp(CreateView):
     form_class = CreationForm
     success_url = reverse_lazy('posts:main_page')
     template_name = 'users/signup.html'
+    query_budget = QueryBudget(2, None)
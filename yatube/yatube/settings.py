@@ -1,4 +1,6 @@
 import os
+import sys
+import tempfile
 import sentry_sdk
 from dotenv import load_dotenv
 from sentry_sdk.integrations.django import DjangoIntegration
@@ -43,7 +45,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'posts',
+    'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core',
     'about',
@@ -53,12 +55,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.PageCacheMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
@@ -145,12 +149,95 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
+# default - двухуровневый кеш: L1 в памяти воркера поверх общего
+# для всех воркеров L2. Без REDIS_URL общий уровень хранится в файлах
+# (нужен пакет django-redis, если REDIS_URL задан).
+REDIS_URL = os.getenv('REDIS_URL')
+
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'default',
+        'OPTIONS': {
+            'L2': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 30,
+            'STAMP_INTERVAL': 1,
+        },
+    },
+    'shared': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'CACHE_DIR', os.path.join(tempfile.gettempdir(), 'yatube-cache')
+        ),
+    },
+}
+
+# Тесты чистят кеш через cache.clear(): общий L2 в них живёт в памяти
+# процесса, чтобы прогон тестов на сервере не стёр кеш сайта.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    CACHES['shared'] = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
     }
-}
 
 
 POSTS = 10
 PROFILE_POSTS = 5
+
+PAGINATOR_MAX_PAGES = 100
+PAGINATOR_COUNT_TIMEOUT = 60
+PAGINATOR_EXACT_COUNT_LIMIT = 1000
+
+FEED_CACHE_TIMEOUT = 60 * 60
+PAGE_CACHE_TIMEOUT = 60 * 10
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Миниатюры создаются в пуле процессов при загрузке картинки,
+# веб-запросы их только читают.
+THUMBNAIL_GEOMETRIES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+THUMBNAIL_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
+IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_RATIO = 960 / 339
+IMAGE_LQIP_SIZE = 16
+IMAGE_LQIP_QUALITY = 30
+
+# Загрузки: бомбы декомпрессии отклоняются по заголовку, большие
+# картинки уменьшаются при приёме.
+IMAGE_MAX_PIXELS = 60_000_000
+IMAGE_MAX_SIDE = 2560
+IMAGE_INGEST_REDUCING_GAP = 2.0
+# Сборщик мусора не трогает файлы моложе суток: их пост может быть
+# ещё не закоммичен.
+MEDIA_GC_GRACE = 60 * 60 * 24
+
+STAMPEDE_LOCK_CACHE = 'shared'
+STAMPEDE_LOCK_TIMEOUT = 10
+STAMPEDE_GRACE = 60 * 60
+STAMPEDE_POLL_INTERVAL = 0.05
+
+TOP_TAGS = 10
+TOP_TAGS_WINDOW_HOURS = 24
+TOP_TAGS_CACHE_TIMEOUT = 60
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_CACHE_TIMEOUT = 60
+
+ADMIN_BULK_BATCH_SIZE = 1000
+
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL = 200
+TIMELINE_BATCH_SIZE = 1000
+
+QUERY_BUDGET_ENFORCE = bool(os.getenv('QUERY_BUDGET_ENFORCE'))
+QUERY_BUDGET_TIME_MS = 100